@@ -0,0 +1,192 @@
+"""Admission control: token-bucket rate limits and a bounded concurrency gate per route.
+
+Decisions use only the matched route and a client key, so a shed request
+costs no body parsing or calculation: rate-limited requests get 429, and
+requests that find the concurrency gate full with its queue budget spent
+get 503, both with Retry-After. Limits are per worker process; with N
+workers a route's total budget is N times its configured rate.
+
+Limits come from DEFAULT_LIMITS, overridden route by route with a JSON
+object such as
+
+    {"/api/forecast": {"rate": 100, "client_rate": 5, "concurrency": 2, "queue": 1}}
+
+where a zero rate or concurrency means unlimited.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+import json
+import math
+import threading
+import time
+from typing import Callable, Dict, Mapping, Tuple
+
+DEFAULT_MAX_CLIENTS = 10000
+
+# (status, retry_after_seconds, reason)
+Rejection = Tuple[int, int, str]
+
+
+@dataclass(frozen=True)
+class RouteLimits:
+    rate: float = 0.0
+    burst: float = 0.0
+    client_rate: float = 0.0
+    client_burst: float = 0.0
+    concurrency: int = 0
+    queue: int = 0
+    queue_timeout: float = 0.1
+
+    @classmethod
+    def from_dict(cls, route: str, data: Mapping[str, object]) -> "RouteLimits":
+        unknown = set(data) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"unknown admission settings for {route}: {', '.join(sorted(unknown))}")
+        values: Dict[str, float] = {}
+        for name, value in data.items():
+            number = float(value)
+            if number < 0:
+                raise ValueError(f"admission setting {route}.{name} must not be negative")
+            values[name] = int(number) if name in ("concurrency", "queue") else number
+        # A burst defaults to one second's worth of requests.
+        values["burst"] = values.get("burst") or values.get("rate", 0.0)
+        values["client_burst"] = values.get("client_burst") or values.get("client_rate", 0.0)
+        return cls(**values)
+
+
+# Sized for gunicorn.conf.py's 4 threads per worker. Queued requests hold a thread
+# too, so a gate only bites when concurrency + queue stays below the thread count,
+# leaving threads for other routes. /api/evaluate is the cheap, mostly cached hot
+# path; gating it would only shed cheap requests, so it is rate-limited alone.
+DEFAULT_LIMITS: Dict[str, RouteLimits] = {
+    "/api/evaluate": RouteLimits(rate=500, burst=1000, client_rate=20, client_burst=60),
+    "/api/evaluate/batch": RouteLimits(
+        rate=20, burst=40, client_rate=2, client_burst=5, concurrency=2, queue=1
+    ),
+    "/api/forecast": RouteLimits(
+        rate=200, burst=400, client_rate=10, client_burst=30, concurrency=2, queue=1
+    ),
+    "/api/forecast/uncertainty": RouteLimits(
+        rate=50, burst=100, client_rate=5, client_burst=10, concurrency=2, queue=1
+    ),
+}
+
+
+def parse_limits(raw: str | None) -> Dict[str, RouteLimits]:
+    """DEFAULT_LIMITS with the routes in a JSON override replaced."""
+    limits = dict(DEFAULT_LIMITS)
+    if raw:
+        for route, data in json.loads(raw).items():
+            limits[route] = RouteLimits.from_dict(route, data)
+    return limits
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token: 0.0 when admitted, otherwise the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class ConcurrencyGate:
+    """At most `limit` requests inside; up to `queue` more wait `timeout` seconds for a slot."""
+
+    def __init__(self, limit: int, queue: int, timeout: float) -> None:
+        self.queue = queue
+        self.timeout = timeout
+        self._slots = threading.Semaphore(limit)
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def enter(self) -> bool:
+        if self._slots.acquire(blocking=False):
+            return True
+        with self._lock:
+            if self._waiting >= self.queue:
+                return False
+            self._waiting += 1
+        try:
+            return self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def leave(self) -> None:
+        self._slots.release()
+
+
+class _Route:
+    __slots__ = ("limits", "bucket", "clients", "gate")
+
+    def __init__(self, limits: RouteLimits, now: float) -> None:
+        self.limits = limits
+        self.bucket = TokenBucket(limits.rate, limits.burst, now) if limits.rate else None
+        self.clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.gate = None
+        if limits.concurrency:
+            self.gate = ConcurrencyGate(limits.concurrency, limits.queue, limits.queue_timeout)
+
+
+class AdmissionController:
+    """Admits or sheds requests per route; routes without limits are always admitted."""
+
+    def __init__(
+        self,
+        limits: Mapping[str, RouteLimits],
+        max_clients: int = DEFAULT_MAX_CLIENTS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        now = clock()
+        self.max_clients = max_clients
+        self._clock = clock
+        self._routes = {route: _Route(route_limits, now) for route, route_limits in limits.items()}
+        self._lock = threading.Lock()
+
+    def admit(self, route: str, client: str) -> Rejection | None:
+        """None when admitted (call `release` when the request ends), otherwise why it was shed."""
+        state = self._routes.get(route)
+        if state is None:
+            return None
+        limits = state.limits
+        with self._lock:
+            now = self._clock()
+            if limits.client_rate:
+                bucket = state.clients.get(client)
+                if bucket is None:
+                    bucket = state.clients[client] = TokenBucket(limits.client_rate, limits.client_burst, now)
+                    if len(state.clients) > self.max_clients:
+                        state.clients.popitem(last=False)
+                else:
+                    state.clients.move_to_end(client)
+                wait = bucket.take(now)
+                if wait:
+                    return 429, max(1, math.ceil(wait)), "client_rate"
+            if state.bucket is not None:
+                wait = state.bucket.take(now)
+                if wait:
+                    return 429, max(1, math.ceil(wait)), "rate"
+        if state.gate is not None and not state.gate.enter():
+            return 503, 1, "concurrency"
+        return None
+
+    def release(self, route: str) -> None:
+        state = self._routes.get(route)
+        if state is not None and state.gate is not None:
+            state.gate.leave()
+
+
+__all__ = ["AdmissionController", "DEFAULT_LIMITS", "RouteLimits", "parse_limits"]
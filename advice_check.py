@@ -0,0 +1,97 @@
+"""Check that hashed advice selection stays uniform across variants.
+
+Replays every (role, tone, phase) table over a range of observation dates
+and cycle days, compares the hashed selection in calculator.py with the
+legacy random.Random selection, and fails when a chi-square test rejects a
+uniform distribution.
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+import random
+from statistics import NormalDist
+import sys
+from typing import Dict, List, Tuple
+
+from calculator import MAX_CYCLE_LENGTH, _advice_index, _advice_tables
+
+SIGNIFICANCE = 0.001
+# Chi-square critical values at p = 0.001, indexed by degrees of freedom.
+CHI_SQUARE_CRITICAL = {1: 10.83, 2: 13.82, 3: 16.27, 4: 18.47, 5: 20.52, 6: 22.46}
+
+
+def critical_value(dof: int) -> float:
+    """Chi-square critical value at SIGNIFICANCE: the table, else Wilson-Hilferty (within 1% from 7 dof)."""
+    if dof < 1:
+        # A single variant is always selected, so there is nothing to test.
+        return 0.0
+    if dof in CHI_SQUARE_CRITICAL:
+        return CHI_SQUARE_CRITICAL[dof]
+    z = NormalDist().inv_cdf(1 - SIGNIFICANCE)
+    spread = 2 / (9 * dof)
+    return dof * (1 - spread + z * spread**0.5) ** 3
+
+
+def _chi_square(counts: List[int]) -> float:
+    expected = sum(counts) / len(counts)
+    return sum((count - expected) ** 2 / expected for count in counts)
+
+
+def check_distribution(start: date, days: int) -> List[Dict[str, object]]:
+    rows = []
+    for (role, tone, phase_key), variants in sorted(_advice_tables().items()):
+        hashed = [0] * len(variants)
+        legacy = [0] * len(variants)
+        unchanged = 0
+        for offset in range(days):
+            observed = (start + timedelta(days=offset)).isoformat()
+            for cycle_day in range(1, MAX_CYCLE_LENGTH + 1):
+                seed = f"{phase_key}-{role}-{tone}-{observed}-{cycle_day}"
+                new_index = _advice_index(seed, len(variants))
+                old_index = random.Random(seed).randrange(len(variants))
+                hashed[new_index] += 1
+                legacy[old_index] += 1
+                unchanged += new_index == old_index
+        samples = sum(hashed)
+        rows.append(
+            {
+                "table": (role, tone, phase_key),
+                "hashed": hashed,
+                "legacy": legacy,
+                "chi_square": _chi_square(hashed),
+                "critical": critical_value(len(variants) - 1),
+                "unchanged": unchanged / samples,
+            }
+        )
+    return rows
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--start", default="2024-01-01", help="first observation date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=730, help="number of observation dates to replay")
+    args = parser.parse_args(argv)
+
+    rows = check_distribution(date.fromisoformat(args.start), args.days)
+    failures: List[Tuple[str, str, str]] = []
+    for row in rows:
+        status = "ok" if row["chi_square"] <= row["critical"] else "NOT UNIFORM"
+        if status != "ok":
+            failures.append(row["table"])
+        print(
+            "{:<28} hashed={} legacy={} chi2={:.2f} (<= {:.2f}) unchanged={:.1%} {}".format(
+                "/".join(row["table"]),
+                row["hashed"],
+                row["legacy"],
+                row["chi_square"],
+                row["critical"],
+                row["unchanged"],
+                status,
+            )
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,41 +1,793 @@
 from __future__ import annotations
 
-from flask import Flask, jsonify, render_template, request
+from datetime import date, datetime, time, timedelta
+import hmac
+import os
+import signal
+import threading
+from time import monotonic, perf_counter
+from typing import Dict, Hashable, List, Tuple
 
-from calculator import calculate_cycle_details
+from flask import Flask, Response, abort, g, redirect, render_template, request
+
+from admission import AdmissionController, parse_limits
+from calculator import (
+    MAX_CYCLE_LENGTH,
+    MAX_MENSES_DAYS,
+    MIN_CYCLE_LENGTH,
+    MIN_MENSES_DAYS,
+    _text_fields,
+    calculate_cycle_details,
+    calculate_cycle_details_batch,
+    cycle_numbers_from_payload,
+    evaluation_args_from_payload,
+    forecast_cycle_range,
+    set_timing_hook,
+    shared_content,
+)
+from content_pack import ContentPack, get_pack, install_reload_signal, reload_pack, reload_requested, source_changed
+from cycle_history import CycleHistory, parse_entries
+from debug_profiler import MAX_WINDOW_SECONDS, AllocationTracker, RequestProfiler
+from hormone_model import MODELS
+from metrics import (
+    LATENCY_BUCKETS,
+    STAGE_BUCKETS,
+    MetricsRegistry,
+    current_stages,
+    record_stage,
+    server_timing_header,
+    stage,
+    start_stages,
+    stop_stages,
+)
+from persistent_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, PersistentCache, result_version
+from phase_calendar import count_phase_days, get_calendar, next_phase_windows, phase_timeline
+from response_cache import ResponseCache
+from serialization import COMPRESSION_MIN_SIZE, FragmentEncoder, compress, negotiate_encoding
+from shared_tables import install as install_shared_tables
+from static_assets import PAGE_MAX_AGE, AssetRegistry, PrecompressedAsset
+from uncertainty import DEFAULT_CYCLE_LENGTH_STD, DEFAULT_LUTEAL_STD, DEFAULT_SAMPLES, prediction_bands
+
+MAX_BATCH_ITEMS = 1000
+EXPLICIT_DATE_MAX_AGE = 86400
 
 app = Flask(__name__)
+app.config["SERVER_TIMING"] = os.environ.get("SERVER_TIMING", "0") == "1"
+app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED", "1") == "1"
+app.config["ADMIN_TOKEN"] = os.environ.get("ADMIN_TOKEN") or None
+app.config["CONTENT_POLL_INTERVAL"] = float(os.environ.get("CONTENT_POLL_INTERVAL", "5"))
+# Set by gunicorn.conf.py in each worker so an admin reload can reach every worker.
+app.config["GUNICORN_MASTER_PID"] = None
+app.config["ADMISSION_ENABLED"] = os.environ.get("ADMISSION_ENABLED", "0") == "1"
+# Trust a proxy header (e.g. X-Forwarded-For) for client keys only when set.
+app.config["ADMISSION_CLIENT_HEADER"] = os.environ.get("ADMISSION_CLIENT_HEADER") or None
+# Proxies in front of the app that each append one address to the client header.
+app.config["ADMISSION_TRUSTED_PROXIES"] = max(1, int(os.environ.get("ADMISSION_TRUSTED_PROXIES", "1")))
+admission = AdmissionController(parse_limits(os.environ.get("ADMISSION_LIMITS")))
+if app.config["ADMISSION_ENABLED"] and app.config["ADMISSION_CLIENT_HEADER"] is None:
+    app.logger.warning(
+        "admission control keys clients on the connection address; behind a proxy set ADMISSION_CLIENT_HEADER"
+    )
+# The /debug/ surface also needs ADMIN_TOKEN; while it is off the hooks below return immediately.
+app.config["DEBUG_PROFILER"] = os.environ.get("DEBUG_PROFILER", "0") == "1"
+profiler = RequestProfiler(float(os.environ.get("DEBUG_PROFILE_RATE", "0")))
+allocations = AllocationTracker()
+response_cache = ResponseCache(int(os.environ.get("RESPONSE_CACHE_SIZE", "4096")))
+metrics_registry = MetricsRegistry(os.environ.get("METRICS_DIR") or None)
+if "gunicorn" in os.environ.get("SERVER_SOFTWARE", "") and metrics_registry.directory is None:
+    app.logger.warning("METRICS_DIR is not set: /metrics reports only the worker that answers the scrape")
+persistent_cache = (
+    PersistentCache(
+        os.environ["PERSISTENT_CACHE_PATH"],
+        ttl=float(os.environ.get("PERSISTENT_CACHE_TTL", DEFAULT_TTL)),
+        max_bytes=int(os.environ.get("PERSISTENT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+    )
+    if os.environ.get("PERSISTENT_CACHE_PATH")
+    else None
+)
+set_timing_hook(record_stage)
+_encoder_state: Tuple[ContentPack, FragmentEncoder] | None = None
+_result_version: Tuple[ContentPack, str] | None = None
+_next_content_check = 0.0
+assets = AssetRegistry()
+app.jinja_env.globals["asset_url"] = assets.url
+_index_page: PrecompressedAsset | None = None
+
+
+# With a preloaded app the master maps (and if needed publishes) the tables
+# once and forked workers share the mapping.
+if os.environ.get("SHARED_TABLES_DIR"):
+    try:
+        install_shared_tables(os.environ["SHARED_TABLES_DIR"])
+    except (OSError, ValueError) as exc:
+        app.logger.warning("shared model tables unavailable, compiling them per process: %s", exc)
+
+
+def _content_reload_signal() -> int | None:
+    name = os.environ.get("CONTENT_RELOAD_SIGNAL", "SIGHUP")
+    return getattr(signal, name) if name else None
+
+
+def install_content_reload_signal() -> None:
+    """Reload the content pack on CONTENT_RELOAD_SIGNAL (default SIGHUP); call again after a fork resets handlers."""
+    signum = _content_reload_signal()
+    if signum is not None and threading.current_thread() is threading.main_thread():
+        install_reload_signal(signum)
+
+
+install_content_reload_signal()
+_ready = threading.Event()
+
+
+def _encoder() -> FragmentEncoder:
+    # Fragments are rebuilt for each content pack; results from an older pack
+    # still encode correctly through the encoder's json.dumps fallback.
+    global _encoder_state
+    pack = get_pack()
+    state = _encoder_state
+    if state is None or state[0] is not pack:
+        state = _encoder_state = (pack, FragmentEncoder(shared_content(pack)))
+    return state[1]
+
+
+def _reload_content() -> ContentPack:
+    """Swap in the content pack from disk and drop responses built from the old one."""
+    previous = get_pack().content_version
+    pack = reload_pack()
+    if pack.content_version != previous:
+        response_cache.clear()
+        app.logger.info("content pack reloaded: %s -> %s", previous, pack.content_version)
+    return pack
+
+
+def _evaluation_cache_key(args: Dict[str, object], today: date) -> Hashable:
+    role = args["role"] if args["role"] in {"self", "partner"} else "self"
+    tone = args["tone"] if args["tone"] in {"gentle", "playful"} else "gentle"
+    return (
+        get_pack().content_version,
+        args["last_period_date"],
+        args["observation_date"] or today.isoformat(),
+        args["cycle_length"],
+        args["menses_days"],
+        role,
+        tone,
+        args["model"] or "",
+    )
+
+
+def _persistent_key(namespace: str, key: Hashable) -> Hashable:
+    global _result_version
+    pack = get_pack()
+    state = _result_version
+    if state is None or state[0] is not pack:
+        state = _result_version = (pack, result_version(pack))
+    return (namespace, state[1], key)
+
+
+def _persistent_get(namespace: str, key: Hashable) -> bytes | None:
+    """Body from the shared second-tier cache, if one is configured."""
+    if persistent_cache is None:
+        return None
+    with stage("persistent_cache"):
+        body = persistent_cache.get(_persistent_key(namespace, key))
+    if app.config["METRICS_ENABLED"]:
+        result = (("namespace", namespace), ("result", "miss" if body is None else "hit"))
+        metrics_registry.inc("hcc_persistent_cache_lookups_total", result)
+    return body
+
+
+def _persistent_put(namespace: str, key: Hashable, body: bytes, ttl: float | None = None) -> None:
+    if persistent_cache is not None:
+        with stage("persistent_cache"):
+            persistent_cache.put(_persistent_key(namespace, key), body, ttl)
+
+
+def warm_up() -> None:
+    """Run the first-call paths once so the first real requests do not pay for them.
+
+    Compiles the lookup, hormone and calendar tables for every model and
+    cycle state, the advice tables and fragment encoder, the URL map and
+    the landing page. Goes through the functions rather than the test
+    client so no request metrics are recorded. Marks the process ready.
+    """
+    if _ready.is_set():
+        return
+    today = date.today().isoformat()
+    for model in MODELS:
+        for role in ("self", "partner"):
+            for tone in ("gentle", "playful"):
+                _encoder().encode_details(calculate_cycle_details(today, role=role, tone=tone, model=model))
+        forecast_cycle_range(today, model=model)
+        prediction_bands(today, samples=1, model=model)
+    for cycle_length in range(MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH + 1):
+        for menses_days in range(MIN_MENSES_DAYS, MAX_MENSES_DAYS + 1):
+            get_calendar(cycle_length, menses_days)
+    adapter = app.url_map.bind("localhost")
+    for rule in app.url_map.iter_rules():
+        if not rule.arguments:
+            adapter.match(rule.rule, method=next(iter(rule.methods - {"HEAD", "OPTIONS"}), "GET"))
+    _render_index()
+    _ready.set()
+
+
+def _json_response(payload: object, status: int = 200) -> Response:
+    return app.response_class(_encoder().encode(payload), status=status, mimetype="application/json")
+
+
+def _json_object() -> Dict[str, object]:
+    """The JSON request body, which must be an object; an empty body reads as {}."""
+    payload = request.get_json() or {}
+    if not isinstance(payload, dict):
+        raise ValueError("请求内容需要是 JSON 对象。")
+    return payload
+
+
+def _seconds_until_midnight(now: datetime) -> int:
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+    return max(1, int((midnight - now).total_seconds()))
+
+
+@app.before_request
+def _refresh_content():
+    # Each worker polls the pack file on its own, so every worker converges
+    # on an edit no matter which one received the signal or admin call.
+    global _next_content_check
+    reload = reload_requested()
+    interval = app.config["CONTENT_POLL_INTERVAL"]
+    if not reload and interval > 0:
+        now = monotonic()
+        if now >= _next_content_check:
+            _next_content_check = now + interval
+            reload = source_changed()
+    if reload:
+        try:
+            _reload_content()
+        except (OSError, ValueError) as exc:
+            app.logger.error("content pack reload failed, keeping %s: %s", get_pack().content_version, exc)
+
+
+@app.before_request
+def _start_timing():
+    if app.config["METRICS_ENABLED"] or app.config["SERVER_TIMING"]:
+        g.request_started = perf_counter()
+        start_stages()
+
+
+def _client_key() -> str:
+    header = app.config["ADMISSION_CLIENT_HEADER"]
+    if header:
+        hops = [hop.strip() for hop in request.headers.get(header, "").split(",") if hop.strip()]
+        if hops:
+            # Clients control the leftmost entries; the address our outermost trusted proxy saw is
+            # the one it appended, ADMISSION_TRUSTED_PROXIES entries from the right.
+            return hops[-min(app.config["ADMISSION_TRUSTED_PROXIES"], len(hops))]
+    return request.remote_addr or ""
+
+
+@app.before_request
+def _admit():
+    # Runs before any view touches the body, so shedding costs no parsing.
+    if not app.config["ADMISSION_ENABLED"] or request.url_rule is None:
+        return None
+    route = request.url_rule.rule
+    rejection = admission.admit(route, _client_key())
+    if rejection is None:
+        g.admitted_route = route
+        return None
+    status, retry_after, reason = rejection
+    if app.config["METRICS_ENABLED"]:
+        metrics_registry.inc("hcc_admission_shed_total", (("route", route), ("reason", reason)))
+    message = "请求过于频繁，请稍后再试。" if status == 429 else "服务繁忙，请稍后再试。"
+    response = _json_response({"error": message}, status)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+@app.before_request
+def _start_profile():
+    if not app.config["DEBUG_PROFILER"] or request.url_rule is None or request.path.startswith("/debug/"):
+        return
+    profile = profiler.start()
+    if profile is not None:
+        g.profile = profile
+
+
+@app.after_request
+def _finish_timing(response: Response) -> Response:
+    stages = current_stages()
+    if stages is None:
+        return response
+    total = perf_counter() - g.request_started
+
+    if app.config["METRICS_ENABLED"]:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        status = (("route", route), ("status", str(response.status_code)))
+        metrics_registry.inc("hcc_http_requests_total", status)
+        if response.status_code >= 400:
+            metrics_registry.inc("hcc_http_errors_total", status)
+        metrics_registry.observe("hcc_http_request_duration_seconds", (("route", route),), total, LATENCY_BUCKETS)
+        for name, seconds in stages:
+            metrics_registry.observe(
+                "hcc_stage_duration_seconds", (("route", route), ("stage", name)), seconds, STAGE_BUCKETS
+            )
+        metrics_registry.maybe_flush()
+
+    if app.config["SERVER_TIMING"]:
+        response.headers["Server-Timing"] = server_timing_header(stages, total)
+    return response
+
+
+@app.after_request
+def _compress(response: Response) -> Response:
+    if (
+        not request.path.startswith("/api/")
+        or response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    encoding = negotiate_encoding(request)
+    if encoding is None or len(body) < COMPRESSION_MIN_SIZE:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+@app.teardown_request
+def _stop_timing(exc: BaseException | None) -> None:
+    stop_stages()
+
+
+@app.teardown_request
+def _finish_profile(exc: BaseException | None) -> None:
+    # Teardown runs after the after_request hooks, so the profile covers encoding and compression too.
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profiler.finish(request.url_rule.rule, profile)
+
+
+@app.teardown_request
+def _release_admission(exc: BaseException | None) -> None:
+    route = g.pop("admitted_route", None)
+    if route is not None:
+        admission.release(route)
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    return _json_response({"status": "ok"})
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    if not _ready.is_set():
+        return _json_response({"status": "warming"}, 503)
+    return _json_response({"status": "ready", "content_version": get_pack().content_version})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _render_index() -> PrecompressedAsset:
+    # The landing page has no per-request context, so it is rendered once per process.
+    global _index_page
+    if _index_page is None:
+        with app.app_context():
+            html = render_template("index.html")
+        _index_page = PrecompressedAsset(
+            html.encode("utf-8"), "text/html; charset=utf-8", f"public, max-age={PAGE_MAX_AGE}"
+        )
+    return _index_page
 
 
 @app.route("/", methods=["GET"])
 def index():
-    return render_template("index.html")
+    return _render_index().response(request)
+
+
+@app.route("/assets/<path:filename>", methods=["GET"])
+def asset(filename: str):
+    try:
+        found = assets.resolve(filename)
+    except FileNotFoundError:
+        abort(404)
+    if found is None:
+        # Pages cached before a deploy may still reference an older fingerprint.
+        return redirect(assets.url(assets.split_fingerprint(filename)[0]))
+    return found.response(request)
 
 
-@app.route("/api/evaluate", methods=["POST"])
+@app.route("/api/evaluate", methods=["GET", "POST"])
 def api_evaluate():
-    payload = request.get_json() or {}
+    try:
+        with stage("parse"):
+            payload = request.args if request.method == "GET" else _json_object()
+            args = evaluation_args_from_payload(payload)
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, 400)
+
+    # Read the clock once: the cache key, max-age and the result must agree on the day.
+    now = datetime.now()
+    today = now.date()
+    # Without target_date the result is "today's" view and expires at midnight.
+    if args["observation_date"]:
+        max_age = EXPLICIT_DATE_MAX_AGE
+    else:
+        max_age = _seconds_until_midnight(now)
 
+    key = _evaluation_cache_key(args, today)
+    entry = response_cache.get(key)
+    if entry is None:
+        body = _persistent_get("evaluate", key)
+        if body is None:
+            try:
+                result = calculate_cycle_details(**args, today=today)
+            except ValueError as exc:
+                return _json_response({"error": str(exc)}, 400)
+            with stage("serialize"):
+                body = _encoder().encode_details(result)
+            _persistent_put("evaluate", key, body, None if args["observation_date"] else max_age)
+        entry = response_cache.put(key, body)
+
+    encoding = negotiate_encoding(request) if len(entry.body) >= COMPRESSION_MIN_SIZE else None
+    etag = f"{entry.etag}-{encoding}" if encoding else entry.etag
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(entry.encoded(encoding), mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
+
+
+@app.route("/api/evaluate/batch", methods=["POST"])
+def api_evaluate_batch():
+    payload = request.get_json(silent=True)
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return _json_response({"error": "请提供需要批量评估的 items 数组。"}, 400)
+    if len(items) > MAX_BATCH_ITEMS:
+        return _json_response({"error": f"单次批量评估最多 {MAX_BATCH_ITEMS} 条。"}, 400)
+
+    results = [None] * len(items)
+    pending = []
+    positions = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[position] = {"error": "每一项都需要是 JSON 对象。"}
+            continue
+        try:
+            pending.append(evaluation_args_from_payload(item))
+        except ValueError as exc:
+            results[position] = {"error": str(exc)}
+            continue
+        positions.append(position)
+
+    for position, result in zip(positions, calculate_cycle_details_batch(pending)):
+        results[position] = result
+
+    return app.response_class(_encoder().encode_batch(results), mimetype="application/json")
+
+
+@app.route("/api/forecast", methods=["POST"])
+def api_forecast():
+    try:
+        payload = _json_object()
+        cycle_length, menses_days = cycle_numbers_from_payload(payload)
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, 400)
+    try:
+        days = int(payload["days"]) if payload.get("days") else None
+    except (TypeError, ValueError, OverflowError):
+        return _json_response({"error": "预测天数需要是数字。"}, 400)
+
+    try:
+        result = forecast_cycle_range(
+            payload.get("last_date"),
+            start_date=payload.get("start_date"),
+            end_date=payload.get("end_date"),
+            days=days,
+            cycle_length=cycle_length,
+            menses_days=menses_days,
+            model=payload.get("model"),
+        )
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, 400)
+
+    return _json_response(result)
+
+
+@app.route("/api/forecast/uncertainty", methods=["POST"])
+def api_forecast_uncertainty():
+    try:
+        payload = _json_object()
+        cycle_length, menses_days = cycle_numbers_from_payload(payload)
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, 400)
+    try:
+        days = int(payload["days"]) if payload.get("days") else None
+        samples = int(payload["samples"]) if payload.get("samples") else DEFAULT_SAMPLES
+    except (TypeError, ValueError, OverflowError):
+        return _json_response({"error": "预测天数与采样次数需要是数字。"}, 400)
+    try:
+        cycle_length_std = float(payload.get("cycle_length_std", DEFAULT_CYCLE_LENGTH_STD))
+        luteal_std = float(payload.get("luteal_std", DEFAULT_LUTEAL_STD))
+    except (TypeError, ValueError):
+        return _json_response({"error": "周期波动范围需要是数字。"}, 400)
+
+    arguments = {
+        "start_date": payload.get("start_date"),
+        "end_date": payload.get("end_date"),
+        "days": days,
+        "cycle_length": cycle_length,
+        "menses_days": menses_days,
+        "cycle_length_std": cycle_length_std,
+        "luteal_std": luteal_std,
+        "samples": samples,
+        "model": payload.get("model"),
+    }
+    # Sampling is the slowest endpoint, so its bodies go to the shared cache too.
+    key = (payload.get("last_date"), *sorted(arguments.items()))
+    body = _persistent_get("uncertainty", key)
+    if body is None:
+        try:
+            result = prediction_bands(payload.get("last_date"), **arguments)
+        except ValueError as exc:
+            return _json_response({"error": str(exc)}, 400)
+        body = _encoder().encode(result)
+        _persistent_put("uncertainty", key, body)
+    return app.response_class(body, mimetype="application/json")
+
+
+@app.route("/api/calendar/next", methods=["POST"])
+def api_calendar_next():
+    try:
+        payload = _json_object()
+        cycle_length, menses_days = cycle_numbers_from_payload(payload)
+        result = next_phase_windows(
+            payload.get("last_date"),
+            from_date=payload.get("from_date"),
+            cycle_length=cycle_length,
+            menses_days=menses_days,
+            phase=payload.get("phase") or None,
+        )
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, 400)
+    return _json_response(result)
+
+
+@app.route("/api/calendar/counts", methods=["POST"])
+def api_calendar_counts():
+    try:
+        payload = _json_object()
+        cycle_length, menses_days = cycle_numbers_from_payload(payload)
+        result = count_phase_days(
+            payload.get("last_date"),
+            start_date=payload.get("start_date"),
+            end_date=payload.get("end_date"),
+            cycle_length=cycle_length,
+            menses_days=menses_days,
+        )
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, 400)
+    return _json_response(result)
+
+
+@app.route("/api/calendar/timeline", methods=["POST"])
+def api_calendar_timeline():
     try:
-        cycle_length = int(payload.get("cycle_length") or 28)
-        menses_days = int(payload.get("menses_days") or 5)
-    except ValueError:
-        return jsonify({"error": "周期长度与经期天数需要是数字。"}), 400
+        payload = _json_object()
+        cycle_length, menses_days = cycle_numbers_from_payload(payload)
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, 400)
+    try:
+        days = int(payload["days"]) if payload.get("days") else None
+    except (TypeError, ValueError, OverflowError):
+        return _json_response({"error": "预测天数需要是数字。"}, 400)
 
     try:
-        result = calculate_cycle_details(
+        result = phase_timeline(
             payload.get("last_date"),
-            observation_date=payload.get("target_date"),
+            start_date=payload.get("start_date"),
+            end_date=payload.get("end_date"),
+            days=days,
             cycle_length=cycle_length,
             menses_days=menses_days,
-            role=(payload.get("role") or "self"),
-            tone=(payload.get("tone") or "gentle"),
+            model=payload.get("model"),
         )
     except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
+        return _json_response({"error": str(exc)}, 400)
+    return _json_response(result)
+
+
+@app.route("/api/history", methods=["POST"])
+def api_history():
+    try:
+        payload = _json_object()
+        role, tone = _text_fields(payload, ("role", "tone"), "角色与语气需要是文本。")
+        (model,) = _text_fields(payload, ("model",), "激素模型名称需要是文本。")
+        history = CycleHistory.from_token(payload["state"]) if payload.get("state") else CycleHistory()
+        history.extend(parse_entries(payload.get("period_starts") or []))
+        result = {"state": history.to_token(), "summary": history.summary()}
+        if history.last_start is not None:
+            result["details"] = calculate_cycle_details(
+                **history.evaluation_args(),
+                observation_date=payload.get("target_date"),
+                role=role or "self",
+                tone=tone or "gentle",
+                model=model,
+            )
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, 400)
+    return _json_response(result)
+
+
+def _admin_denied() -> Response | None:
+    """401 unless the request carries ADMIN_TOKEN; admin routes do not exist without one."""
+    token = app.config["ADMIN_TOKEN"]
+    if token is None:
+        abort(404)
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+        return _json_response({"error": "管理令牌无效。"}, 401)
+    return None
+
+
+@app.route("/admin/content/reload", methods=["POST"])
+def admin_reload_content():
+    denied = _admin_denied()
+    if denied is not None:
+        return denied
+
+    previous = get_pack().content_version
+    try:
+        pack = _reload_content()
+    except (OSError, ValueError) as exc:
+        return _json_response({"error": f"内容包加载失败：{exc}", "version": previous}, 400)
+    # This call reached one worker; the others swap in place on their next request.
+    signalled = _signal_other_workers()
+    return _json_response(
+        {
+            "previous": previous,
+            "version": pack.content_version,
+            "pid": os.getpid(),
+            "scope": "this_process" if signalled is None else "all_workers",
+            "signalled": signalled or [],
+        }
+    )
+
+
+def _catches(pid: int, signum: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("SigCgt:"):
+                    return bool(int(line.split()[1], 16) >> (signum - 1) & 1)
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+def _signal_other_workers() -> List[int] | None:
+    """Send the content reload signal to the other gunicorn workers; None when they cannot be reached.
+
+    The workers are the master's children (Linux /proc). One still starting up
+    has not installed its handler, which the signal would kill, so it is
+    skipped; post_worker_init checks the pack file instead.
+    """
+    master = app.config["GUNICORN_MASTER_PID"]
+    signum = _content_reload_signal()
+    if not master or signum is None:
+        return None
+    try:
+        with open(f"/proc/{master}/task/{master}/children", encoding="ascii") as handle:
+            children = [int(pid) for pid in handle.read().split()]
+    except (OSError, ValueError):
+        return None
+    signalled = []
+    for pid in children:
+        if pid == os.getpid() or not _catches(pid, signum):
+            continue
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            continue
+        signalled.append(pid)
+    return signalled
+
+
+def _debug_denied() -> Response | None:
+    if not app.config["DEBUG_PROFILER"]:
+        abort(404)
+    return _admin_denied()
+
+
+@app.route("/debug/profile", methods=["GET", "POST"])
+def debug_profile():
+    denied = _debug_denied()
+    if denied is not None:
+        return denied
+    if request.method == "POST":
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return _json_response({"error": "请求内容需要是 JSON 对象。"}, 400)
+        if "rate" in payload:
+            try:
+                rate = float(payload["rate"])
+            except (TypeError, ValueError):
+                rate = -1.0
+            if not 0.0 <= rate <= 1.0:
+                return _json_response({"error": "采样比例需要在 0 到 1 之间。"}, 400)
+            profiler.rate = rate
+        if payload.get("reset"):
+            profiler.reset()
+    return _json_response({"pid": os.getpid(), "rate": profiler.rate, "samples": profiler.samples()})
+
+
+@app.route("/debug/profile/stats", methods=["GET"])
+def debug_profile_stats():
+    denied = _debug_denied()
+    if denied is not None:
+        return denied
+    route = request.args.get("route") or None
+    if request.args.get("format") == "text":
+        try:
+            report = profiler.report(route, sort=request.args.get("sort", "cumulative"))
+        except KeyError:
+            return _json_response({"error": "不支持的排序方式。"}, 400)
+        body = report
+    else:
+        body = profiler.dump(route)
+    if body is None:
+        return _json_response({"error": "还没有采样到请求。"}, 404)
+    if isinstance(body, str):
+        return Response(body, mimetype="text/plain")
+    response = Response(body, mimetype="application/octet-stream")
+    response.headers["Content-Disposition"] = f"attachment; filename=hcc-{os.getpid()}.pstats"
+    return response
+
 
-    return jsonify(result)
+@app.route("/debug/allocations", methods=["GET", "POST", "DELETE"])
+def debug_allocations():
+    denied = _debug_denied()
+    if denied is not None:
+        return denied
+    if request.method == "POST":
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return _json_response({"error": "请求内容需要是 JSON 对象。"}, 400)
+        try:
+            seconds = float(payload.get("seconds", 30))
+            frames = int(payload.get("frames", 16))
+        except (TypeError, ValueError, OverflowError):
+            return _json_response({"error": "窗口时长与栈深度需要是数字。"}, 400)
+        if not 1 <= frames <= 64:
+            return _json_response({"error": "栈深度需要在 1 到 64 之间。"}, 400)
+        views = {
+            rule.rule: app.view_functions[rule.endpoint]
+            for rule in app.url_map.iter_rules()
+            if not rule.rule.startswith("/debug/")
+        }
+        try:
+            started = allocations.start(seconds, views, frames)
+        except ValueError:
+            return _json_response({"error": f"窗口时长需要在 0 到 {MAX_WINDOW_SECONDS:g} 秒之间。"}, 400)
+        if not started:
+            return _json_response({"error": "已有分配追踪正在进行。"}, 409)
+    elif request.method == "DELETE":
+        allocations.finish()
+    return _json_response({"pid": os.getpid(), **allocations.status()})
 
 
 if __name__ == "__main__":
+    warm_up()
     app.run(debug=True)
@@ -0,0 +1,211 @@
+"""Benchmark the calculator and the /api/evaluate HTTP layer.
+
+Writes machine-readable results and compares them with a stored baseline,
+exiting non-zero when any benchmark regresses beyond the threshold.
+
+    python bench.py --save-baseline          # record bench_baseline.json
+    python bench.py --threshold 0.2          # compare against it
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from calculator import (
+    MAX_CYCLE_LENGTH,
+    MAX_MENSES_DAYS,
+    MIN_CYCLE_LENGTH,
+    MIN_MENSES_DAYS,
+    calculate_cycle_details,
+    calculate_hormone_status,
+)
+
+ROLES = ("self", "partner", "other")
+TONES = ("gentle", "playful")
+
+
+def _random_payloads(rng: random.Random, count: int) -> List[Dict[str, object]]:
+    today = date.today()
+    payloads = []
+    for _ in range(count):
+        last = today - timedelta(days=rng.randint(0, 365))
+        payloads.append(
+            {
+                "last_date": last.isoformat(),
+                "target_date": (last + timedelta(days=rng.randint(0, 120))).isoformat(),
+                "cycle_length": rng.randint(MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH),
+                "menses_days": rng.randint(MIN_MENSES_DAYS, MAX_MENSES_DAYS),
+                "role": rng.choice(ROLES),
+                "tone": rng.choice(TONES),
+            }
+        )
+    return payloads
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _measure(calls: List[Callable[[], object]], warmup: int) -> Dict[str, float]:
+    for call in calls[:warmup]:
+        call()
+
+    latencies = []
+    started = time.perf_counter()
+    for call in calls:
+        begin = time.perf_counter_ns()
+        call()
+        latencies.append((time.perf_counter_ns() - begin) / 1000.0)
+    elapsed = time.perf_counter() - started
+
+    sample = calls[: min(len(calls), 200)]
+    tracemalloc.start()
+    peaks = []
+    for call in sample:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "calls": len(calls),
+        "throughput_per_s": len(calls) / elapsed,
+        "p50_us": _percentile(latencies, 0.50),
+        "p90_us": _percentile(latencies, 0.90),
+        "p99_us": _percentile(latencies, 0.99),
+        "max_us": latencies[-1],
+        "peak_bytes_per_call": sum(peaks) / len(peaks),
+    }
+
+
+def run_benchmarks(iterations: int, seed: int) -> Dict[str, Dict[str, float]]:
+    from app import app, response_cache
+
+    rng = random.Random(seed)
+    payloads = _random_payloads(rng, iterations)
+    client = app.test_client()
+    results = {}
+
+    results["calculate_cycle_details"] = _measure(
+        [
+            (
+                lambda p=p: calculate_cycle_details(
+                    p["last_date"],
+                    observation_date=p["target_date"],
+                    cycle_length=p["cycle_length"],
+                    menses_days=p["menses_days"],
+                    role=p["role"],
+                    tone=p["tone"],
+                )
+            )
+            for p in payloads
+        ],
+        warmup=min(200, iterations),
+    )
+    results["calculate_hormone_status"] = _measure(
+        [
+            (lambda p=p, gender=rng.choice(("female", "male")): calculate_hormone_status(p["last_date"], gender))
+            for p in payloads
+        ],
+        warmup=min(200, iterations),
+    )
+
+    def post(payload: Dict[str, object]) -> None:
+        response = client.post("/api/evaluate", json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/evaluate returned {response.status_code}: {response.data!r}")
+        response.get_json()
+
+    def post_uncached(payload: Dict[str, object]) -> None:
+        response_cache.clear()
+        post(payload)
+
+    results["http_evaluate_uncached"] = _measure(
+        [(lambda p=p: post_uncached(p)) for p in payloads],
+        warmup=min(200, iterations),
+    )
+    results["http_evaluate_cached"] = _measure(
+        [(lambda p=p: post(p)) for p in payloads[:50] * max(1, iterations // 50)],
+        warmup=min(200, iterations),
+    )
+    return results
+
+
+# Metrics where a larger value is a regression; throughput is the inverse.
+LOWER_IS_BETTER = ("p50_us", "p90_us", "p99_us", "peak_bytes_per_call")
+HIGHER_IS_BETTER = ("throughput_per_s",)
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    regressions = []
+    for name, metrics in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in LOWER_IS_BETTER:
+            if previous.get(metric) and metrics[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {previous[metric]:.1f} -> {metrics[metric]:.1f}")
+        for metric in HIGHER_IS_BETTER:
+            if previous.get(metric) and metrics[metric] < previous[metric] * (1 - threshold):
+                regressions.append(f"{name}.{metric}: {previous[metric]:.1f} -> {metrics[metric]:.1f}")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark calculator.py and /api/evaluate.")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.iterations, args.seed)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "iterations": args.iterations,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+
+    for name, metrics in results.items():
+        print(
+            f"{name:<28} {metrics['throughput_per_s']:>10.0f}/s  p50={metrics['p50_us']:.1f}us "
+            f"p90={metrics['p90_us']:.1f}us p99={metrics['p99_us']:.1f}us "
+            f"mem={metrics['peak_bytes_per_call']:.0f}B"
+        )
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)["results"]
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
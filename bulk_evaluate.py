@@ -0,0 +1,199 @@
+"""Stream CSV or NDJSON records through calculator.py in parallel.
+
+Each input record uses the /api/evaluate field names (last_date,
+target_date, cycle_length, menses_days, role, tone, model). Records are
+read lazily, evaluated in chunks on a process pool and written in input
+order; invalid records produce an error row instead of aborting the run.
+
+    python bulk_evaluate.py users.csv -o results.ndjson --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import csv
+from itertools import islice
+import json
+import os
+import sys
+import time
+from typing import Dict, IO, Iterable, Iterator, List, Tuple
+
+from calculator import HORMONE_KEYS, calculate_cycle_details_batch, evaluation_args_from_payload
+
+CSV_COLUMNS = (
+    "line",
+    "id",
+    "observed_date",
+    "cycle_day",
+    "cycle_length",
+    "phase_key",
+    "phase",
+) + HORMONE_KEYS + ("advice_headline", "error")
+
+Record = Tuple[int, object]
+
+
+def _detect_format(path: str, explicit: str | None) -> str:
+    if explicit:
+        return explicit
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def read_records(handle: IO[str], fmt: str) -> Iterator[Record]:
+    """Yield (line number, record) pairs; unparsable NDJSON lines yield the error message."""
+    if fmt == "csv":
+        reader = csv.DictReader(handle)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, "无法解析的 JSON 行。"
+
+
+def evaluate_chunk(records: List[Record], id_field: str) -> List[Dict[str, object]]:
+    rows: List[Dict[str, object] | None] = [None] * len(records)
+    pending = []
+    positions = []
+    for position, (line_number, record) in enumerate(records):
+        if not isinstance(record, dict):
+            message = record if isinstance(record, str) else "每一项都需要是 JSON 对象。"
+            rows[position] = {"line": line_number, "error": message}
+            continue
+        try:
+            pending.append(evaluation_args_from_payload(record))
+        except ValueError as exc:
+            rows[position] = {"line": line_number, "id": record.get(id_field), "error": str(exc)}
+            continue
+        positions.append(position)
+
+    for position, result in zip(positions, calculate_cycle_details_batch(pending)):
+        line_number, record = records[position]
+        # Advice variants are read-only content pack mappings, which neither pickle nor json can take.
+        rows[position] = {"line": line_number, "id": record.get(id_field), **result, "advice": dict(result["advice"])}
+    return rows
+
+
+def _chunks(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_stream(
+    records: Iterable[Record],
+    *,
+    workers: int,
+    chunk_size: int,
+    id_field: str,
+) -> Iterator[Dict[str, object]]:
+    """Evaluate records chunk by chunk, yielding rows in input order."""
+    if workers <= 1:
+        for chunk in _chunks(records, chunk_size):
+            yield from evaluate_chunk(chunk, id_field)
+        return
+
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight: "deque[Future]" = deque()
+        for chunk in _chunks(records, chunk_size):
+            in_flight.append(pool.submit(evaluate_chunk, chunk, id_field))
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def _csv_row(row: Dict[str, object]) -> Dict[str, object]:
+    flat = {key: row.get(key) for key in CSV_COLUMNS if key in row}
+    hormones = row.get("hormones") or {}
+    for key in HORMONE_KEYS:
+        flat[key] = hormones.get(key)
+    advice = row.get("advice") or {}
+    flat["advice_headline"] = advice.get("headline")
+    return flat
+
+
+class Progress:
+    def __init__(self, stream: IO[str], interval: float) -> None:
+        self.stream = stream
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.records = 0
+        self.errors = 0
+
+    def update(self, row: Dict[str, object]) -> None:
+        self.records += 1
+        self.errors += "error" in row
+        now = time.monotonic()
+        if self.interval and now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        label = "done" if final else "progress"
+        print(
+            f"{label}: {self.records} records, {self.errors} errors, "
+            f"{elapsed:.1f}s, {self.records / elapsed:.0f} records/s",
+            file=self.stream,
+        )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-evaluate cycle records from CSV or NDJSON.")
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout (default)")
+    parser.add_argument("--input-format", choices=("csv", "ndjson"))
+    parser.add_argument("--output-format", choices=("csv", "ndjson"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--id-field", default="id", help="input field copied to each output row")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress lines, 0 to disable")
+    args = parser.parse_args(argv)
+
+    input_format = _detect_format(args.input, args.input_format)
+    output_format = _detect_format(args.output, args.output_format) if args.output != "-" else (
+        args.output_format or "ndjson"
+    )
+
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    progress = Progress(sys.stderr, args.progress_interval)
+    try:
+        writer = csv.DictWriter(target, fieldnames=CSV_COLUMNS) if output_format == "csv" else None
+        if writer is not None:
+            writer.writeheader()
+        rows = evaluate_stream(
+            read_records(source, input_format),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            id_field=args.id_field,
+        )
+        for row in rows:
+            if writer is not None:
+                writer.writerow(_csv_row(row))
+            else:
+                target.write(json.dumps(row, ensure_ascii=False) + "\n")
+            progress.update(row)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    progress.report(final=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
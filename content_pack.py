@@ -0,0 +1,247 @@
+"""Versioned symptom and advice content, loaded lazily from a compiled snapshot.
+
+The editable source is a JSON content pack (content/advice_pack.json by
+default, or the CONTENT_PACK environment variable). It is compiled to a
+marshal snapshot next to it, guarded by a SHA-256 checksum of the payload
+and the digest of the source it was built from, so a stale or corrupt
+snapshot is rebuilt instead of loaded. Loaded content is immutable:
+strings are interned, lists become tuples and every mapping, however
+deep, is a read-only MappingProxyType.
+
+`reload_pack` swaps in a new version at runtime; results built from the
+previous pack stay valid, and derived caches key on `content_version`.
+
+    python content_pack.py          # compile the snapshot ahead of time
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import signal
+import sys
+from threading import Event, Lock
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+DEFAULT_SOURCE = os.path.join(CONTENT_DIR, "advice_pack.json")
+SNAPSHOT_MAGIC = b"HCCPACK1"
+PHASES = ("menstruation", "follicular", "ovulation", "luteal")
+SELF_FIELDS = ("headline", "items")
+PARTNER_FIELDS = ("headline", "tips", "phrases")
+
+
+class ContentPack:
+    __slots__ = ("version", "digest", "content_version", "symptoms", "self_advice", "partner_advice")
+
+    def __init__(self, version: str, digest: str, data: Mapping[str, Mapping[str, tuple]]) -> None:
+        self.version = version
+        self.digest = digest
+        # Identifies this exact content, for keying derived caches.
+        self.content_version = f"{version}+{digest[:12]}"
+        self.symptoms = _read_only(data["symptoms"])
+        self.self_advice = _read_only(data["self_advice"])
+        self.partner_advice = _read_only(data["partner_advice"])
+
+
+def _freeze(value: object) -> object:
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return {sys.intern(key): _freeze(item) for key, item in value.items()}
+    return value
+
+
+def _read_only(value: object) -> object:
+    # Marshal snapshots cannot hold proxies, so they wrap the frozen data on load.
+    if isinstance(value, dict):
+        return MappingProxyType({key: _read_only(item) for key, item in value.items()})
+    if isinstance(value, tuple):
+        return tuple(_read_only(item) for item in value)
+    return value
+
+
+def _check_variants(section: str, library: object, fields: Tuple[str, ...]) -> None:
+    if not isinstance(library, dict):
+        raise ValueError(f"内容包缺少 {section}。")
+    for phase in PHASES:
+        variants = library.get(phase)
+        if not isinstance(variants, list) or not variants:
+            raise ValueError(f"内容包 {section}.{phase} 至少需要一条建议。")
+        for index, variant in enumerate(variants):
+            if not isinstance(variant, dict) or not isinstance(variant.get("headline"), str):
+                raise ValueError(f"内容包 {section}.{phase}[{index}] 缺少 headline。")
+            for name in fields[1:]:
+                items = variant.get(name)
+                if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+                    raise ValueError(f"内容包 {section}.{phase}[{index}].{name} 需要是字符串列表。")
+
+
+def validate(data: object) -> Dict[str, object]:
+    """Check the structure of a decoded content pack and return its frozen form."""
+    if not isinstance(data, dict) or not isinstance(data.get("version"), str) or not data["version"]:
+        raise ValueError("内容包缺少 version。")
+    symptoms = data.get("symptoms")
+    if not isinstance(symptoms, dict):
+        raise ValueError("内容包缺少 symptoms。")
+    for phase in PHASES:
+        if not isinstance(symptoms.get(phase), list) or not all(isinstance(item, str) for item in symptoms[phase]):
+            raise ValueError(f"内容包 symptoms.{phase} 需要是字符串列表。")
+    _check_variants("self_advice", data.get("self_advice"), SELF_FIELDS)
+    _check_variants("partner_advice", data.get("partner_advice"), PARTNER_FIELDS)
+    return {
+        "version": sys.intern(data["version"]),
+        "symptoms": _freeze(symptoms),
+        "self_advice": _freeze(data["self_advice"]),
+        "partner_advice": _freeze(data["partner_advice"]),
+    }
+
+
+def snapshot_path(source: str) -> str:
+    return os.path.splitext(source)[0] + ".snapshot"
+
+
+def _read_snapshot(path: str, digest: str) -> Dict[str, object] | None:
+    try:
+        with open(path, "rb") as handle:
+            raw = handle.read()
+    except OSError:
+        return None
+    header = len(SNAPSHOT_MAGIC)
+    if raw[:header] != SNAPSHOT_MAGIC:
+        return None
+    checksum, payload = raw[header : header + 32], raw[header + 32 :]
+    if hashlib.sha256(payload).digest() != checksum:
+        return None
+    try:
+        source_digest, python_version, data = marshal.loads(payload)
+    except (EOFError, ValueError, TypeError):
+        return None
+    if source_digest != digest or python_version != tuple(sys.version_info[:2]):
+        return None
+    return data
+
+
+def _write_snapshot(path: str, digest: str, data: Dict[str, object]) -> None:
+    payload = marshal.dumps((digest, tuple(sys.version_info[:2]), data))
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as handle:
+            handle.write(SNAPSHOT_MAGIC + hashlib.sha256(payload).digest() + payload)
+        os.replace(temporary, path)
+    except OSError:
+        # A read-only deploy still works; it just parses the JSON each start.
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def _source_path(source: str | None) -> str:
+    return source or os.environ.get("CONTENT_PACK") or DEFAULT_SOURCE
+
+
+def _stat(source: str) -> Tuple[int, int, int] | None:
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def load_pack(source: str | None = None, snapshot: str | None = None) -> ContentPack:
+    source = _source_path(source)
+    snapshot = snapshot or snapshot_path(source)
+    with open(source, "rb") as handle:
+        raw = handle.read()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    data = _read_snapshot(snapshot, digest)
+    if data is None:
+        data = validate(json.loads(raw.decode("utf-8")))
+        _write_snapshot(snapshot, digest, data)
+    return ContentPack(data["version"], digest, data)
+
+
+_pack: ContentPack | None = None
+_pack_stat: Tuple[int, int, int] | None = None
+_pack_lock = Lock()
+_reload_requested = Event()
+
+
+def get_pack() -> ContentPack:
+    """The process-wide content pack, loaded on first use."""
+    if _pack is None:
+        with _pack_lock:
+            if _pack is None:
+                _swap(_source_path(None))
+    return _pack
+
+
+def _swap(source: str) -> ContentPack:
+    global _pack, _pack_stat
+    # Stat before reading, so an edit that lands mid-read is picked up by the next check.
+    stat = _stat(source)
+    try:
+        pack = load_pack(source)
+    except (OSError, ValueError):
+        if _pack is not None:
+            # Keep serving the current pack and don't retry until the file changes again.
+            _pack_stat = stat
+        raise
+    _pack, _pack_stat = pack, stat
+    return pack
+
+
+def reload_pack(source: str | None = None) -> ContentPack:
+    """Load and validate the content pack again, then swap it in.
+
+    Readers never wait: they keep the pack they already hold, and a pack
+    that fails to load or validate leaves the current one in place.
+    """
+    with _pack_lock:
+        return _swap(_source_path(source))
+
+
+def source_changed(source: str | None = None) -> bool:
+    """Whether the content pack file differs from the one last loaded."""
+    return _pack is not None and _stat(_source_path(source)) != _pack_stat
+
+
+def install_reload_signal(signum: int) -> None:
+    """Request a reload when `signum` arrives; see `reload_requested`."""
+    signal.signal(signum, lambda received, frame: _reload_requested.set())
+
+
+def reload_requested() -> bool:
+    """Consume a pending reload request from the signal handler."""
+    if not _reload_requested.is_set():
+        return False
+    _reload_requested.clear()
+    return True
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile the content pack snapshot.")
+    parser.add_argument("--source", default=None, help="content pack JSON (default: CONTENT_PACK or content/advice_pack.json)")
+    parser.add_argument("--snapshot", default=None, help="snapshot path (default: next to the source)")
+    args = parser.parse_args(argv)
+
+    source = _source_path(args.source)
+    snapshot = args.snapshot or snapshot_path(source)
+    with open(source, "rb") as handle:
+        raw = handle.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    data = validate(json.loads(raw.decode("utf-8")))
+    _write_snapshot(snapshot, digest, data)
+    print(f"compiled {source} (version {data['version']}, {digest[:12]}) -> {snapshot}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
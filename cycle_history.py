@@ -0,0 +1,228 @@
+"""Personalized cycle statistics maintained incrementally from logged period starts.
+
+Each new period start updates exponentially weighted estimates of the
+cycle length (mean, variance and trend between consecutive cycles) and
+of the menses duration in O(1). The whole model packs into a few dozen
+bytes, so services can store the summary instead of the raw log, and
+its personalized cycle_length / menses_days feed `calculate_cycle_details`.
+"""
+from __future__ import annotations
+
+import base64
+from datetime import date, timedelta
+import math
+import struct
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from calculator import (
+    DEFAULT_CYCLE_LENGTH,
+    DEFAULT_MENSES_DAYS,
+    MAX_CYCLE_LENGTH,
+    MAX_MENSES_DAYS,
+    MIN_CYCLE_LENGTH,
+    MIN_MENSES_DAYS,
+    _check_range_end,
+    _parse_date,
+)
+
+DEFAULT_ALPHA = 0.3
+MAX_HISTORY_ENTRIES = 1000
+STATE_VERSION = 1
+# version, alpha, last start ordinal, cycles, skipped, length mean/var/trend,
+# last length, menses count, menses mean
+_STATE_FORMAT = struct.Struct("<BfIHHfffBHf")
+
+
+def _clamp(value: float, low: int, high: int) -> int:
+    return max(low, min(high, int(round(value))))
+
+
+class CycleHistory:
+    """Rolling cycle-length and menses statistics for one user.
+
+    Intervals outside the supported cycle range (usually a missed log) move
+    the last start forward but are left out of the statistics.
+    """
+
+    __slots__ = (
+        "alpha",
+        "last_start",
+        "cycles",
+        "skipped",
+        "mean",
+        "variance",
+        "trend",
+        "last_length",
+        "menses_count",
+        "menses_mean",
+    )
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA) -> None:
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.last_start: date | None = None
+        self.cycles = 0
+        self.skipped = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.trend = 0.0
+        self.last_length = 0
+        self.menses_count = 0
+        self.menses_mean = 0.0
+
+    def add(self, start: date, menses_days: int | None = None) -> None:
+        """Record a period start (and optionally how long it lasted); repeating the last start is a no-op."""
+        if menses_days is not None and not MIN_MENSES_DAYS <= menses_days <= MAX_MENSES_DAYS:
+            raise ValueError("经期持续天数建议在 1-10 天之间。")
+        # The summary projects the next start up to MAX_CYCLE_LENGTH days ahead.
+        _check_range_end(start, MAX_CYCLE_LENGTH + 1)
+        if self.last_start is not None:
+            length = (start - self.last_start).days
+            if length == 0:
+                return
+            if length < 0:
+                raise ValueError("月经开始日期需要按时间先后记录。")
+            if MIN_CYCLE_LENGTH <= length <= MAX_CYCLE_LENGTH:
+                self._add_length(length)
+            else:
+                self.skipped += 1
+        self.last_start = start
+
+        if menses_days is not None:
+            self.menses_count += 1
+            if self.menses_count == 1:
+                self.menses_mean = float(menses_days)
+            else:
+                self.menses_mean += self.alpha * (menses_days - self.menses_mean)
+
+    def _add_length(self, length: int) -> None:
+        self.cycles += 1
+        if self.cycles == 1:
+            self.mean = float(length)
+        else:
+            # Exponentially weighted mean and variance, updated in place.
+            difference = length - self.mean
+            increment = self.alpha * difference
+            self.mean += increment
+            self.variance = (1.0 - self.alpha) * (self.variance + difference * increment)
+            change = length - self.last_length
+            self.trend = float(change) if self.cycles == 2 else self.trend + self.alpha * (change - self.trend)
+        self.last_length = length
+
+    def extend(self, entries: Iterable[Tuple[date, int | None]]) -> None:
+        for start, menses_days in entries:
+            self.add(start, menses_days)
+
+    @property
+    def cycle_length(self) -> int:
+        """Personalized cycle length, the default until a full cycle is logged."""
+        return _clamp(self.mean, MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH) if self.cycles else DEFAULT_CYCLE_LENGTH
+
+    @property
+    def menses_days(self) -> int:
+        if not self.menses_count:
+            return DEFAULT_MENSES_DAYS
+        return _clamp(self.menses_mean, MIN_MENSES_DAYS, MAX_MENSES_DAYS)
+
+    def summary(self) -> Dict[str, object]:
+        next_start = self.last_start + timedelta(days=self.cycle_length) if self.last_start else None
+        return {
+            "last_period_date": self.last_start.isoformat() if self.last_start else None,
+            "cycles": self.cycles,
+            "skipped": self.skipped,
+            "mean_cycle_length": round(self.mean, 2) if self.cycles else None,
+            "cycle_length_std": round(self.variance ** 0.5, 2) if self.cycles else None,
+            "trend": round(self.trend, 2),
+            "cycle_length": self.cycle_length,
+            "menses_days": self.menses_days,
+            "next_period_date": next_start.isoformat() if next_start else None,
+        }
+
+    def evaluation_args(self) -> Dict[str, object]:
+        """`calculate_cycle_details` keyword arguments for the personalized cycle."""
+        if self.last_start is None:
+            raise ValueError("请填写上次月经开始日期。")
+        return {
+            "last_period_date": self.last_start.isoformat(),
+            "cycle_length": self.cycle_length,
+            "menses_days": self.menses_days,
+        }
+
+    def to_bytes(self) -> bytes:
+        return _STATE_FORMAT.pack(
+            STATE_VERSION,
+            self.alpha,
+            self.last_start.toordinal() if self.last_start else 0,
+            min(self.cycles, 0xFFFF),
+            min(self.skipped, 0xFFFF),
+            self.mean,
+            self.variance,
+            self.trend,
+            self.last_length,
+            min(self.menses_count, 0xFFFF),
+            self.menses_mean,
+        )
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "CycleHistory":
+        try:
+            fields = _STATE_FORMAT.unpack(raw)
+        except struct.error as exc:
+            raise ValueError("周期记录状态无效。") from exc
+        version, alpha, ordinal, cycles, skipped, mean, variance, trend, last_length, menses_count, menses_mean = fields
+        # Reject what to_bytes never writes: inf/NaN would overflow cycle_length, a negative
+        # variance has no real std, and a last start at the end of the calendar has no next period.
+        if (
+            version != STATE_VERSION
+            or not 0.0 < alpha <= 1.0
+            or not all(math.isfinite(value) for value in (mean, variance, trend, menses_mean))
+            or variance < 0.0
+            or ordinal > date.max.toordinal() - MAX_CYCLE_LENGTH
+        ):
+            raise ValueError("周期记录状态无效。")
+        history = cls(alpha)
+        history.last_start = date.fromordinal(ordinal) if ordinal else None
+        history.cycles, history.skipped = cycles, skipped
+        history.mean, history.variance, history.trend = mean, variance, trend
+        history.last_length = last_length
+        history.menses_count, history.menses_mean = menses_count, menses_mean
+        return history
+
+    def to_token(self) -> str:
+        """URL-safe text form of `to_bytes`, for JSON payloads and text columns."""
+        return base64.urlsafe_b64encode(self.to_bytes()).rstrip(b"=").decode("ascii")
+
+    @classmethod
+    def from_token(cls, token: str) -> "CycleHistory":
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except (TypeError, ValueError) as exc:
+            raise ValueError("周期记录状态无效。") from exc
+        return cls.from_bytes(raw)
+
+
+def parse_entries(entries: object) -> List[Tuple[date, int | None]]:
+    """Period starts as "YYYY-MM-DD" strings or {"date": ..., "menses_days": ...} objects, sorted by date."""
+    if not isinstance(entries, list):
+        raise ValueError("请提供月经开始日期列表。")
+    if len(entries) > MAX_HISTORY_ENTRIES:
+        raise ValueError(f"单次最多提交 {MAX_HISTORY_ENTRIES} 条记录。")
+    parsed = []
+    for entry in entries:
+        if isinstance(entry, Mapping):
+            menses_days = entry.get("menses_days")
+            try:
+                menses_days = int(menses_days) if menses_days not in (None, "") else None
+            except (TypeError, ValueError, OverflowError) as exc:
+                raise ValueError("周期长度与经期天数需要是数字。") from exc
+            parsed.append((_parse_date(entry.get("date") or ""), menses_days))
+        elif isinstance(entry, str):
+            parsed.append((_parse_date(entry), None))
+        else:
+            raise ValueError("请按照 YYYY-MM-DD 的格式填写日期。")
+    parsed.sort(key=lambda entry: entry[0])
+    return parsed
+
+
+__all__ = ["CycleHistory", "DEFAULT_ALPHA", "MAX_HISTORY_ENTRIES", "parse_entries"]
@@ -0,0 +1,292 @@
+"""Optional local storage for period logs and per-user summaries on SQLite.
+
+Uses only the standard-library sqlite3 in WAL mode. Each process (and each
+thread within it) gets its own pooled connection; connections are reopened
+after a fork. Writes go through executemany in one transaction per batch,
+and the hot queries are fixed SQL strings so sqlite3's per-connection
+statement cache keeps them prepared.
+
+Summaries are CycleHistory states, updated incrementally when new starts
+arrive in order and rebuilt from the log only on backfills. Each summary
+also stores the user's next phase transition, indexed for "who changes
+phase on day D" queries.
+
+    python cycle_store.py bench --db /tmp/cycles.db --users 200000 --cycles 12
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+from itertools import groupby, islice
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from calculator import MAX_CYCLE_LENGTH, MAX_MENSES_DAYS, MIN_CYCLE_LENGTH, MIN_MENSES_DAYS
+from cycle_history import CycleHistory
+from phase_calendar import get_calendar
+
+DEFAULT_BATCH_SIZE = 5000
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS period_logs (
+        user_id TEXT NOT NULL,
+        start_day INTEGER NOT NULL,
+        menses_days INTEGER,
+        PRIMARY KEY (user_id, start_day)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_summaries (
+        user_id TEXT PRIMARY KEY,
+        state BLOB NOT NULL,
+        last_start_day INTEGER NOT NULL,
+        cycle_length INTEGER NOT NULL,
+        menses_days INTEGER NOT NULL,
+        next_transition_day INTEGER NOT NULL,
+        next_phase TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS user_summaries_next_transition ON user_summaries (next_transition_day)",
+)
+
+INSERT_LOG = "INSERT OR REPLACE INTO period_logs (user_id, start_day, menses_days) VALUES (?, ?, ?)"
+SELECT_LOG = "SELECT start_day, menses_days FROM period_logs WHERE user_id = ? ORDER BY start_day"
+SELECT_LAST_CYCLES = (
+    "SELECT start_day, menses_days FROM period_logs WHERE user_id = ? ORDER BY start_day DESC LIMIT ?"
+)
+SELECT_STATE = "SELECT state FROM user_summaries WHERE user_id = ?"
+UPSERT_SUMMARY = (
+    "INSERT OR REPLACE INTO user_summaries "
+    "(user_id, state, last_start_day, cycle_length, menses_days, next_transition_day, next_phase) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_TRANSITIONS_ON = "SELECT user_id, next_phase FROM user_summaries WHERE next_transition_day = ?"
+SELECT_STALE_TRANSITIONS = (
+    "SELECT user_id, last_start_day, cycle_length, menses_days FROM user_summaries "
+    "WHERE next_transition_day < ? LIMIT ?"
+)
+UPDATE_TRANSITION = "UPDATE user_summaries SET next_transition_day = ?, next_phase = ? WHERE user_id = ?"
+
+Entry = Tuple[date, int | None]
+
+
+def _next_transition(last_start_day: int, cycle_length: int, menses_days: int, as_of_day: int) -> Tuple[int, str]:
+    """First phase change after `as_of_day`, as (day ordinal, phase_key)."""
+    calendar = get_calendar(cycle_length, menses_days)
+    offset, index = calendar.next_transition((as_of_day - last_start_day) % cycle_length)
+    return as_of_day + offset, calendar.segments[index][0]
+
+
+class CycleStore:
+    """Period logs and summaries in one SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        with self.connection() as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use and again after a fork."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30.0, cached_statements=64)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA temp_store=MEMORY")
+            connection.execute("PRAGMA cache_size=-65536")
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local = threading.local()
+
+    def add_periods(
+        self,
+        entries: Iterable[Tuple[str, date, int | None]],
+        *,
+        as_of: date | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Store (user_id, start, menses_days) rows and refresh the affected summaries.
+
+        Rows are written in batches of `batch_size`, one transaction each.
+        Returns the number of rows written.
+        """
+        as_of_day = (as_of or date.today()).toordinal()
+        iterator = iter(entries)
+        written = 0
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return written
+            batch.sort(key=lambda row: (row[0], row[1]))
+            connection = self.connection()
+            with connection:
+                connection.executemany(
+                    INSERT_LOG, [(user_id, start.toordinal(), menses_days) for user_id, start, menses_days in batch]
+                )
+                summaries = [
+                    self._summary_row(connection, user_id, [(start, menses) for _, start, menses in rows], as_of_day)
+                    for user_id, rows in groupby(batch, key=lambda row: row[0])
+                ]
+                connection.executemany(UPSERT_SUMMARY, summaries)
+            written += len(batch)
+
+    def _summary_row(
+        self, connection: sqlite3.Connection, user_id: str, new_entries: List[Entry], as_of_day: int
+    ) -> Tuple[object, ...]:
+        row = connection.execute(SELECT_STATE, (user_id,)).fetchone()
+        if row is None:
+            # No summary means no earlier log rows: this batch is the whole history.
+            history = CycleHistory()
+            history.extend(new_entries)
+        else:
+            history = CycleHistory.from_bytes(row[0])
+            if history.last_start is None or new_entries[0][0] <= history.last_start:
+                # A backfill replays the full log, which already holds this batch.
+                history = CycleHistory()
+                history.extend(
+                    (date.fromordinal(day), menses_days)
+                    for day, menses_days in connection.execute(SELECT_LOG, (user_id,))
+                )
+            else:
+                history.extend(new_entries)
+
+        last_start_day = history.last_start.toordinal()
+        cycle_length, menses_days = history.cycle_length, history.menses_days
+        transition_day, next_phase = _next_transition(last_start_day, cycle_length, menses_days, as_of_day)
+        return (user_id, history.to_bytes(), last_start_day, cycle_length, menses_days, transition_day, next_phase)
+
+    def last_cycles(self, user_id: str, count: int) -> List[Dict[str, object]]:
+        """The user's last `count` completed cycles, newest first."""
+        rows = self.connection().execute(SELECT_LAST_CYCLES, (user_id, count + 1)).fetchall()
+        return [
+            {
+                "start_date": date.fromordinal(start_day).isoformat(),
+                "cycle_length": next_start - start_day,
+                "menses_days": menses_days,
+            }
+            for (next_start, _), (start_day, menses_days) in zip(rows, rows[1:])
+        ]
+
+    def summary(self, user_id: str) -> Dict[str, object] | None:
+        row = self.connection().execute(SELECT_STATE, (user_id,)).fetchone()
+        return CycleHistory.from_bytes(row[0]).summary() if row else None
+
+    def history(self, user_id: str) -> CycleHistory | None:
+        row = self.connection().execute(SELECT_STATE, (user_id,)).fetchone()
+        return CycleHistory.from_bytes(row[0]) if row else None
+
+    def users_transitioning_on(self, day: date) -> Iterator[Tuple[str, str]]:
+        """(user_id, phase_key) for every user whose next phase starts on `day`.
+
+        Call `refresh_transitions(day)` first so transitions already passed
+        have been moved forward.
+        """
+        return iter(self.connection().execute(SELECT_TRANSITIONS_ON, (day.toordinal(),)))
+
+    def refresh_transitions(self, as_of: date, *, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Move every stored next transition that is before `as_of` to the first one on or after it."""
+        # Anchoring at the day before makes a transition on `as_of` itself count.
+        anchor = as_of.toordinal() - 1
+        connection = self.connection()
+        updated = 0
+        while True:
+            with connection:
+                rows = connection.execute(SELECT_STALE_TRANSITIONS, (anchor + 1, batch_size)).fetchall()
+                if not rows:
+                    return updated
+                connection.executemany(
+                    UPDATE_TRANSITION,
+                    [
+                        (*_next_transition(last_start_day, cycle_length, menses_days, anchor), user_id)
+                        for user_id, last_start_day, cycle_length, menses_days in rows
+                    ],
+                )
+            updated += len(rows)
+
+
+def _synthetic_entries(users: int, cycles: int, start: date, seed: int) -> Iterator[Tuple[str, date, int]]:
+    rng = random.Random(seed)
+    for user in range(users):
+        user_id = f"user-{user:08d}"
+        typical = rng.randint(MIN_CYCLE_LENGTH + 3, MAX_CYCLE_LENGTH - 3)
+        menses_days = rng.randint(MIN_MENSES_DAYS + 2, MAX_MENSES_DAYS - 3)
+        day = start - timedelta(days=rng.randrange(MAX_CYCLE_LENGTH))
+        for _ in range(cycles):
+            yield user_id, day, menses_days + rng.randint(-1, 1)
+            day += timedelta(days=typical + rng.randint(-3, 3))
+
+
+def bench(path: str, users: int, cycles: int, lookups: int, seed: int) -> Dict[str, float]:
+    if os.path.exists(path):
+        raise SystemExit(f"{path} already exists; benchmark needs a fresh database")
+    store = CycleStore(path)
+    start = date(2020, 1, 1)
+    as_of = start + timedelta(days=cycles * 30)
+
+    began = time.perf_counter()
+    rows = store.add_periods(_synthetic_entries(users, cycles, start, seed), as_of=as_of)
+    insert_seconds = time.perf_counter() - began
+
+    rng = random.Random(seed + 1)
+    latencies = []
+    for _ in range(lookups):
+        user_id = f"user-{rng.randrange(users):08d}"
+        began = time.perf_counter_ns()
+        store.last_cycles(user_id, 6)
+        latencies.append((time.perf_counter_ns() - began) / 1000.0)
+    latencies.sort()
+
+    began = time.perf_counter()
+    refreshed = store.refresh_transitions(as_of + timedelta(days=30))
+    refresh_seconds = time.perf_counter() - began
+    began = time.perf_counter()
+    due = sum(1 for _ in store.users_transitioning_on(as_of + timedelta(days=30)))
+    due_seconds = time.perf_counter() - began
+    store.close()
+
+    return {
+        "rows": rows,
+        "insert_rows_per_s": round(rows / insert_seconds),
+        "lookup_p50_us": round(latencies[len(latencies) // 2], 1),
+        "lookup_p99_us": round(latencies[int(len(latencies) * 0.99)], 1),
+        "refreshed_users": refreshed,
+        "refresh_seconds": round(refresh_seconds, 3),
+        "transitions_on_day": due,
+        "transitions_query_ms": round(due_seconds * 1000, 2),
+        "database_bytes": os.path.getsize(path),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="SQLite cycle store utilities.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench_parser = commands.add_parser("bench", help="bulk insert, point lookups and transition queries")
+    bench_parser.add_argument("--db", required=True, help="path of a new database file")
+    bench_parser.add_argument("--users", type=int, default=200000)
+    bench_parser.add_argument("--cycles", type=int, default=12, help="logged periods per user")
+    bench_parser.add_argument("--lookups", type=int, default=20000)
+    bench_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(bench(args.db, args.users, args.cycles, args.lookups, args.seed), indent=2))
+    return 0
+
+
+__all__ = ["CycleStore"]
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Opt-in production profiling: sampled cProfile stats and tracemalloc windows, per route.
+
+`RequestProfiler` profiles a fraction of requests with cProfile and adds
+each profile into one pstats aggregate per route. The aggregate can be
+downloaded in the `pstats` marshal format (`python -m pstats file`,
+snakeviz) or as a text summary. An unsampled request costs one random
+draw, and a zero rate costs a single comparison.
+
+`AllocationTracker` runs tracemalloc for a bounded window. When the
+window closes it snapshots the allocations made in it that are still
+alive. Each allocation is attributed to the route whose view function
+appears in its traceback and grouped by the line that made it. Tracing
+slows every allocation while the window is open, so windows are short
+and only one runs at a time.
+
+Both are per process: under gunicorn each worker samples and tracks its
+own requests.
+"""
+from __future__ import annotations
+
+import cProfile
+from collections import defaultdict
+import inspect
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Mapping, Tuple
+
+MAX_WINDOW_SECONDS = 300.0
+DEFAULT_FRAMES = 16
+DEFAULT_REPORT_LIMIT = 20
+UNATTRIBUTED = "other"
+# Allocations made by tracemalloc and the import machinery say nothing about request handling.
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>")
+
+
+class RequestProfiler:
+    """Samples requests with cProfile and aggregates their stats by route."""
+
+    def __init__(self, rate: float = 0.0, draw: Callable[[], float] = random.random) -> None:
+        self.rate = rate
+        self._draw = draw
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._samples: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def start(self) -> cProfile.Profile | None:
+        """A running profile for a sampled request, otherwise None."""
+        if self.rate <= 0.0 or self._draw() >= self.rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this thread.
+            return None
+        return profile
+
+    def finish(self, route: str, profile: cProfile.Profile) -> None:
+        profile.disable()
+        stats = pstats.Stats(profile)
+        with self._lock:
+            aggregate = self._stats.get(route)
+            if aggregate is None:
+                self._stats[route] = stats
+            else:
+                aggregate.add(stats)
+            self._samples[route] += 1
+
+    def samples(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._samples)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._samples.clear()
+
+    def stats(self, route: str | None = None) -> pstats.Stats | None:
+        """A copy of one route's aggregate, or of all routes merged; None when nothing was sampled."""
+        with self._lock:
+            if route is None:
+                selected = list(self._stats.values())
+            else:
+                selected = [self._stats[route]] if route in self._stats else []
+            if not selected:
+                return None
+            merged = pstats.Stats()
+            merged.add(*selected)
+        return merged
+
+    def dump(self, route: str | None = None) -> bytes | None:
+        """The aggregate in the format `pstats.Stats.dump_stats` writes."""
+        stats = self.stats(route)
+        return None if stats is None else marshal.dumps(stats.stats)
+
+    def report(self, route: str | None = None, sort: str = "cumulative", limit: int = 40) -> str | None:
+        stats = self.stats(route)
+        if stats is None:
+            return None
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+def _code_ranges(views: Mapping[str, Callable]) -> Dict[str, List[Tuple[int, int, str]]]:
+    """(first line, last line, route) of each view function, by source file."""
+    ranges: Dict[str, List[Tuple[int, int, str]]] = defaultdict(list)
+    for route, view in views.items():
+        code = getattr(inspect.unwrap(view), "__code__", None)
+        if code is None:
+            continue
+        lines = [line for _, _, line in code.co_lines() if line is not None]
+        ranges[code.co_filename].append((code.co_firstlineno, max(lines, default=code.co_firstlineno), route))
+    return ranges
+
+
+class AllocationTracker:
+    """One tracemalloc window at a time, reported as allocation hot spots per route."""
+
+    def __init__(self, limit: int = DEFAULT_REPORT_LIMIT) -> None:
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._views: Mapping[str, Callable] = {}
+        self._started = 0.0
+        self._deadline = 0.0
+        self._report: Dict[str, object] | None = None
+
+    def start(self, seconds: float, views: Mapping[str, Callable], frames: int = DEFAULT_FRAMES) -> bool:
+        """Open a window of `seconds`; False when one is already open or tracemalloc is in use elsewhere."""
+        if not 0 < seconds <= MAX_WINDOW_SECONDS:
+            raise ValueError(f"window must be between 0 and {MAX_WINDOW_SECONDS:g} seconds")
+        with self._lock:
+            if self._timer is not None or tracemalloc.is_tracing():
+                return False
+            tracemalloc.start(frames)
+            self._views = views
+            self._started = time.monotonic()
+            self._deadline = self._started + seconds
+            self._timer = threading.Timer(seconds, self.finish)
+            self._timer.daemon = True
+            self._timer.start()
+        return True
+
+    def finish(self) -> Dict[str, object] | None:
+        """Close the open window (early, if it has not run out) and build its report."""
+        with self._lock:
+            timer, self._timer = self._timer, None
+            if timer is None:
+                return self._report
+            timer.cancel()
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            elapsed = time.monotonic() - self._started
+            self._report = self._build_report(snapshot, peak, elapsed)
+            return self._report
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            if self._timer is not None:
+                return {"state": "running", "remaining": round(max(0.0, self._deadline - time.monotonic()), 1)}
+            if self._report is None:
+                return {"state": "idle"}
+            return {"state": "finished", **self._report}
+
+    def _build_report(self, snapshot: tracemalloc.Snapshot, peak: int, elapsed: float) -> Dict[str, object]:
+        ignored = [tracemalloc.Filter(False, name) for name in _IGNORED_FILES]
+        # Nor do the profiler's own aggregates, wherever they were allocated from.
+        ignored.append(tracemalloc.Filter(False, __file__, all_frames=True))
+        snapshot = snapshot.filter_traces(ignored)
+        ranges = _code_ranges(self._views)
+        routes: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        for statistic in snapshot.statistics("traceback"):
+            route = UNATTRIBUTED
+            for frame in statistic.traceback:
+                for first, last, candidate in ranges.get(frame.filename, ()):
+                    if first <= frame.lineno <= last:
+                        route = candidate
+                        break
+            # Frames run from the oldest to the most recent call.
+            site = statistic.traceback[-1]
+            totals = routes[route][f"{os.path.basename(site.filename)}:{site.lineno}"]
+            totals[0] += statistic.size
+            totals[1] += statistic.count
+
+        report: Dict[str, object] = {}
+        for route, sites in routes.items():
+            ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)
+            report[route] = {
+                "size": sum(size for size, _ in sites.values()),
+                "count": sum(count for _, count in sites.values()),
+                "top": [{"line": line, "size": size, "count": count} for line, (size, count) in ranked[: self.limit]],
+            }
+        return {"seconds": round(elapsed, 1), "peak": peak, "routes": report}
+
+
+__all__ = ["AllocationTracker", "MAX_WINDOW_SECONDS", "RequestProfiler"]
@@ -0,0 +1,456 @@
+"""Differential test of every cycle engine against the canonical calculator.py functions.
+
+Enumerates every valid (cycle_length, menses_days, cycle_day) state and a
+set of random (last period, observation) date pairs, then checks each
+engine against `_estimate_phase_key`, `_estimate_hormone_levels` and the
+cycle-day arithmetic of `_resolve_observation`, timing them side by side.
+
+reference.py is the older standalone implementation. Its divergences from
+the canonical functions are reported, not failed: its LH and testosterone
+curves are slightly wider. The `reference` hormone model reproduces them
+and is checked against it.
+
+    python difftest.py --pairs 20000
+    python difftest.py --engine mymodule:engine --json difftest.json
+
+An extra engine is a callable taking the list of (cycle_length,
+menses_days, cycle_day) states and returning one (phase_key, hormones)
+pair per state, hormones ordered as HORMONE_KEYS; either may be None
+when the engine does not compute it.
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+import importlib
+from itertools import groupby
+import json
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from calculator import (
+    MAX_CYCLE_LENGTH,
+    MAX_MENSES_DAYS,
+    MIN_CYCLE_LENGTH,
+    MIN_MENSES_DAYS,
+    PHASE_KEYS,
+    _estimate_hormone_levels,
+    _estimate_phase_key,
+    _phase_codes,
+    _resolve_observation,
+    calculate_cycle_details,
+    calculate_cycle_details_batch,
+    forecast_cycle_range,
+    get_lookup_table,
+)
+from hormone_model import DEFAULT_MODEL, HORMONE_KEYS, REFERENCE_MODEL, compile_table
+from phase_calendar import get_calendar, phase_timeline
+import reference
+from uncertainty import prediction_bands
+
+State = Tuple[int, int, int]
+Result = Tuple[str | None, Tuple[int, ...] | None]
+Engine = Callable[[Sequence[State]], List[Result]]
+# (last period, observation date, cycle_length, menses_days)
+DatePair = Tuple[date, date, int, int]
+
+MAX_EXAMPLES = 5
+REFERENCE_PHASES = {
+    "Menstruation": "menstruation",
+    "Follicular": "follicular",
+    "Ovulation": "ovulation",
+    "Luteal": "luteal",
+}
+# Fixed last period date for engines that take dates rather than cycle days.
+ANCHOR = date(2024, 1, 1)
+
+
+def all_states() -> List[State]:
+    return [
+        (cycle_length, menses_days, cycle_day)
+        for cycle_length in range(MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH + 1)
+        for menses_days in range(MIN_MENSES_DAYS, MAX_MENSES_DAYS + 1)
+        for cycle_day in range(1, cycle_length + 1)
+    ]
+
+
+def _cycles(states: Sequence[State]) -> List[Tuple[int, int, List[int]]]:
+    """Consecutive states grouped by (cycle_length, menses_days)."""
+    return [
+        (cycle_length, menses_days, [state[2] for state in group])
+        for (cycle_length, menses_days), group in groupby(states, key=lambda state: state[:2])
+    ]
+
+
+def _levels(hormones: Dict[str, int]) -> Tuple[int, ...]:
+    return tuple(hormones[key] for key in HORMONE_KEYS)
+
+
+def canonical(states: Sequence[State]) -> List[Result]:
+    return [
+        (_estimate_phase_key(day, length, menses), _levels(_estimate_hormone_levels(day, length)))
+        for length, menses, day in states
+    ]
+
+
+def lookup_table_engine(states: Sequence[State]) -> List[Result]:
+    table = get_lookup_table()
+    return [
+        (table.phase_key(day, length, menses), _levels(table.hormones(day, length, DEFAULT_MODEL.name)))
+        for length, menses, day in states
+    ]
+
+
+def compiled_table_engine(states: Sequence[State]) -> List[Result]:
+    rows = compile_table(DEFAULT_MODEL, MAX_CYCLE_LENGTH).rows
+    return [(None, rows[length][day]) for length, _, day in states]
+
+
+def vectorized_engine(states: Sequence[State]) -> List[Result]:
+    results: List[Result] = []
+    for length, menses, days in _cycles(states):
+        cycle_days = np.asarray(days)
+        codes = _phase_codes(cycle_days, length, menses).tolist()
+        levels = DEFAULT_MODEL.evaluate(cycle_days, length).tolist()
+        results.extend((PHASE_KEYS[code], tuple(row)) for code, row in zip(codes, levels))
+    return results
+
+
+def details_engine(states: Sequence[State]) -> List[Result]:
+    results: List[Result] = []
+    for length, menses, day in states:
+        details = calculate_cycle_details(
+            ANCHOR.isoformat(),
+            observation_date=(ANCHOR + timedelta(days=day - 1)).isoformat(),
+            cycle_length=length,
+            menses_days=menses,
+            model=DEFAULT_MODEL.name,
+        )
+        results.append((details["phase_key"], _levels(details["hormones"])))
+    return results
+
+
+def batch_engine(states: Sequence[State]) -> List[Result]:
+    items = [
+        {
+            "last_period_date": ANCHOR.isoformat(),
+            "observation_date": (ANCHOR + timedelta(days=day - 1)).isoformat(),
+            "cycle_length": length,
+            "menses_days": menses,
+            "model": DEFAULT_MODEL.name,
+        }
+        for length, menses, day in states
+    ]
+    return [(details["phase_key"], _levels(details["hormones"])) for details in calculate_cycle_details_batch(items)]
+
+
+def _one_cycle(function: Callable[..., Dict[str, object]], length: int, menses: int, days: List[int], **kwargs) -> Dict:
+    return function(
+        ANCHOR.isoformat(),
+        start_date=(ANCHOR + timedelta(days=days[0] - 1)).isoformat(),
+        days=len(days),
+        cycle_length=length,
+        menses_days=menses,
+        model=DEFAULT_MODEL.name,
+        **kwargs,
+    )
+
+
+def forecast_engine(states: Sequence[State]) -> List[Result]:
+    results: List[Result] = []
+    for length, menses, days in _cycles(states):
+        forecast = _one_cycle(forecast_cycle_range, length, menses, days)
+        results.extend((day["phase_key"], _levels(day["hormones"])) for day in forecast["days"])
+    return results
+
+
+def calendar_engine(states: Sequence[State]) -> List[Result]:
+    results: List[Result] = []
+    for length, menses, day in states:
+        calendar = get_calendar(length, menses)
+        results.append((calendar.segments[calendar.segment_index(day - 1)][0], None))
+    return results
+
+
+def timeline_engine(states: Sequence[State]) -> List[Result]:
+    results: List[Result] = []
+    for length, menses, days in _cycles(states):
+        timeline = _one_cycle(phase_timeline, length, menses, days)
+        phases = [phase_key for phase_key, _, span in timeline["segments"] for _ in range(span)]
+        curves = list(zip(*(timeline["hormones"][key] for key in HORMONE_KEYS)))
+        first = timeline["start_cycle_day"] - 1
+        results.extend(
+            (phase_key, curves[(first + offset) % length]) for offset, phase_key in enumerate(phases)
+        )
+    return results
+
+
+def zero_spread_bands_engine(states: Sequence[State]) -> List[Result]:
+    """uncertainty.py with no spread: every probability is 0 or 1 and p50 is the level."""
+    results: List[Result] = []
+    for length, menses, days in _cycles(states):
+        bands = _one_cycle(
+            prediction_bands, length, menses, days, cycle_length_std=0.0, luteal_std=0.0, samples=1
+        )
+        probabilities = bands["phase_probabilities"]
+        medians = list(zip(*(bands["hormones"][key]["p50"] for key in HORMONE_KEYS)))
+        for offset in range(len(days)):
+            phase_key = max(PHASE_KEYS, key=lambda key: probabilities[key][offset])
+            results.append((phase_key, medians[offset]))
+    return results
+
+
+def reference_engine(states: Sequence[State]) -> List[Result]:
+    return [
+        (
+            REFERENCE_PHASES[reference.estimate_phase(day, length, menses)],
+            _levels(reference.estimate_hormones(day, length)),
+        )
+        for length, menses, day in states
+    ]
+
+
+def reference_model_engine(states: Sequence[State]) -> List[Result]:
+    table = get_lookup_table()
+    return [
+        (table.phase_key(day, length, menses), _levels(table.hormones(day, length, REFERENCE_MODEL.name)))
+        for length, menses, day in states
+    ]
+
+
+ENGINES: Dict[str, Engine] = {
+    "lookup_table": lookup_table_engine,
+    "compiled_table": compiled_table_engine,
+    "vectorized": vectorized_engine,
+    "calculate_cycle_details": details_engine,
+    "calculate_cycle_details_batch": batch_engine,
+    "forecast_cycle_range": forecast_engine,
+    "phase_calendar": calendar_engine,
+    "phase_timeline": timeline_engine,
+    "uncertainty_zero_spread": zero_spread_bands_engine,
+}
+
+
+def _timed(engine: Engine, states: Sequence[State], repeat: int) -> Tuple[List[Result], float]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = engine(states)
+        best = min(best, time.perf_counter() - started)
+    return results, best
+
+
+def compare(states: Sequence[State], expected: List[Result], actual: List[Result]) -> Dict[str, object]:
+    """Mismatch counts per field (phase or hormone) with the first few examples."""
+    if len(actual) != len(expected):
+        return {"checked": len(states), "mismatches": len(states), "fields": {"length": 1}, "examples": []}
+    fields: Dict[str, int] = {}
+    examples = []
+    mismatched = 0
+    for state, (want_phase, want_levels), (phase, levels) in zip(states, expected, actual):
+        wrong = []
+        if phase is not None and phase != want_phase:
+            wrong.append("phase")
+        if levels is not None:
+            wrong.extend(key for key, want, got in zip(HORMONE_KEYS, want_levels, levels) if want != got)
+        if not wrong:
+            continue
+        mismatched += 1
+        for field in wrong:
+            fields[field] = fields.get(field, 0) + 1
+        if len(examples) < MAX_EXAMPLES:
+            examples.append(
+                {
+                    "state": dict(zip(("cycle_length", "menses_days", "cycle_day"), state)),
+                    "expected": [want_phase, list(want_levels)],
+                    "actual": [phase, list(levels) if levels is not None else None],
+                }
+            )
+    return {"checked": len(states), "mismatches": mismatched, "fields": fields, "examples": examples}
+
+
+def random_date_pairs(count: int, seed: int) -> List[DatePair]:
+    """Random pairs, including observations before the last period and several years after it."""
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        last = date(2000, 1, 1) + timedelta(days=rng.randrange(30 * 365))
+        observed = last + timedelta(days=rng.randint(-60, 3 * 366))
+        length = rng.randint(MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH)
+        pairs.append((last, observed, length, rng.randint(MIN_MENSES_DAYS, MAX_MENSES_DAYS)))
+    return pairs
+
+
+def _canonical_day(last: date, observed: date, length: int, menses: int) -> int | None:
+    try:
+        return _resolve_observation(last.isoformat(), observed.isoformat(), length, menses)[1]
+    except ValueError:
+        return None
+
+
+def _details_day(last: date, observed: date, length: int, menses: int) -> int | None:
+    try:
+        return calculate_cycle_details(
+            last.isoformat(), observation_date=observed.isoformat(), cycle_length=length, menses_days=menses
+        )["cycle_day"]
+    except ValueError:
+        return None
+
+
+def _forecast_day(last: date, observed: date, length: int, menses: int) -> int | None:
+    try:
+        return forecast_cycle_range(
+            last.isoformat(), start_date=observed.isoformat(), days=1, cycle_length=length, menses_days=menses
+        )["days"][0]["cycle_day"]
+    except ValueError:
+        return None
+
+
+def _reference_day(last: date, observed: date, length: int, menses: int) -> int | None:
+    return reference.day_in_cycle(last, observed, length)
+
+
+DAY_ENGINES: Dict[str, Callable[[date, date, int, int], int | None]] = {
+    "calculate_cycle_details": _details_day,
+    "forecast_cycle_range": _forecast_day,
+    "reference.day_in_cycle": _reference_day,
+}
+
+
+def check_dates(pairs: Sequence[DatePair], repeat: int) -> Dict[str, Dict[str, object]]:
+    """Cycle day (None when the observation precedes the last period) per engine."""
+
+    def run(function: Callable[[date, date, int, int], int | None]) -> Callable[[Sequence[State]], List]:
+        return lambda _: [function(*pair) for pair in pairs]
+
+    expected, canonical_seconds = _timed(run(_canonical_day), (), repeat)
+    report = {"_resolve_observation": {"checked": len(pairs), "mismatches": 0, "seconds": canonical_seconds}}
+    for name, function in DAY_ENGINES.items():
+        actual, seconds = _timed(run(function), (), repeat)
+        wrong = [
+            {
+                "last": pair[0].isoformat(),
+                "observed": pair[1].isoformat(),
+                "cycle_length": pair[2],
+                "expected": want,
+                "actual": got,
+            }
+            for pair, want, got in zip(pairs, expected, actual)
+            if want != got
+        ]
+        report[name] = {
+            "checked": len(pairs),
+            "mismatches": len(wrong),
+            "seconds": seconds,
+            "examples": wrong[:MAX_EXAMPLES],
+        }
+    return report
+
+
+def _load_engine(spec: str) -> Tuple[str, Engine]:
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise SystemExit(f"--engine expects module:function, got {spec!r}")
+    return spec, getattr(importlib.import_module(module_name), attribute)
+
+
+def run(pairs: int, seed: int, repeat: int, extra: Dict[str, Engine]) -> Dict[str, object]:
+    states = all_states()
+    expected, canonical_seconds = _timed(canonical, states, repeat)
+
+    engines = {}
+    for name, engine in {**ENGINES, **extra}.items():
+        actual, seconds = _timed(engine, states, repeat)
+        engines[name] = {**compare(states, expected, actual), "seconds": seconds}
+
+    reference_actual, reference_seconds = _timed(reference_engine, states, repeat)
+    model_actual, model_seconds = _timed(reference_model_engine, states, repeat)
+    return {
+        "states": len(states),
+        "canonical_seconds": canonical_seconds,
+        "engines": engines,
+        # Informational: reference.py is expected to differ from the canonical functions.
+        "reference_divergence": {**compare(states, expected, reference_actual), "seconds": reference_seconds},
+        # Checked: the `reference` hormone model must reproduce reference.py exactly.
+        "reference_model": {**compare(states, reference_actual, model_actual), "seconds": model_seconds},
+        "dates": check_dates(random_date_pairs(pairs, seed), repeat),
+    }
+
+
+def _row(name: str, entry: Dict[str, object], baseline: float, status: str) -> str:
+    seconds = entry["seconds"]
+    return "{:<32} {:>7} checked {:>6} mismatched {:>9.2f} ms {:>8.0f} ns/item {:>7.2f}x  {}".format(
+        name,
+        entry["checked"],
+        entry["mismatches"],
+        seconds * 1000,
+        seconds / max(1, entry["checked"]) * 1e9,
+        baseline / seconds if seconds else float("inf"),
+        status,
+    )
+
+
+def print_report(report: Dict[str, object]) -> List[str]:
+    """Print the report and return the names of failed checks."""
+    failures = []
+    canonical_seconds = report["canonical_seconds"]
+    print(f"cycle states: {report['states']} (speed relative to the canonical functions)")
+    canonical_entry = {"checked": report["states"], "mismatches": 0, "seconds": canonical_seconds}
+    print(_row("canonical", canonical_entry, canonical_seconds, "baseline"))
+    for name, entry in report["engines"].items():
+        status = "ok" if not entry["mismatches"] else f"MISMATCH {entry['fields']}"
+        if entry["mismatches"]:
+            failures.append(name)
+        print(_row(name, entry, canonical_seconds, status))
+
+    model = report["reference_model"]
+    status = "ok" if not model["mismatches"] else f"MISMATCH {model['fields']}"
+    if model["mismatches"]:
+        failures.append("reference_model")
+    print(_row("reference model vs reference.py", model, canonical_seconds, status))
+    divergence = report["reference_divergence"]
+    status = f"diverges {divergence['fields']}" if divergence["mismatches"] else "identical"
+    print(_row("reference.py (informational)", divergence, canonical_seconds, status))
+    for example in divergence["examples"]:
+        print(f"    {example['state']}: canonical {example['expected']} reference {example['actual']}")
+
+    dates = report["dates"]
+    baseline = dates["_resolve_observation"]["seconds"]
+    print(f"date pairs: {dates['_resolve_observation']['checked']}")
+    for name, entry in dates.items():
+        status = "baseline" if name == "_resolve_observation" else ("ok" if not entry["mismatches"] else "MISMATCH")
+        if entry["mismatches"]:
+            failures.append(f"dates:{name}")
+        print(_row(name, entry, baseline, status))
+
+    for name, entry in report["engines"].items():
+        for example in entry["examples"]:
+            print(f"  {name} {example['state']}: expected {example['expected']} got {example['actual']}")
+    return failures
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=20000, help="random date pairs to check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per engine; the best is reported")
+    parser.add_argument("--engine", action="append", default=[], help="extra engine as module:function")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.pairs, args.seed, max(1, args.repeat), dict(map(_load_engine, args.engine)))
+    failures = print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+    if failures:
+        print(f"FAILED: {', '.join(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Production gunicorn profile: `gunicorn -c gunicorn.conf.py app:app`.
+
+The app is preloaded in the master and warmed up there (`app.warm_up`),
+then `gc.freeze()` moves everything allocated so far out of the cyclic
+collector's reach, so forked workers keep sharing those pages instead of
+copying them when a collection touches their headers. Each worker starts
+warm and ready. Workers are recycled after a jittered number of requests
+so they do not all restart at once.
+
+Sizing and recycling can be overridden with WEB_CONCURRENCY,
+GUNICORN_THREADS, GUNICORN_MAX_REQUESTS and GUNICORN_MAX_REQUESTS_JITTER.
+"""
+import gc
+import os
+
+
+def _cpu_count() -> int:
+    # Honour CPU affinity (containers, taskset) where the platform exposes it.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# Requests are CPU-bound Python, so one process per core plus one to cover
+# a worker being recycled; threads overlap slow clients and I/O.
+workers = int(os.environ.get("WEB_CONCURRENCY", _cpu_count() + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+preload_app = True
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Workers aggregate /metrics through snapshot files and share the model
+# tables through one mapping; both need a directory common to all of them.
+os.environ.setdefault("METRICS_DIR", "/tmp/hcc-metrics")
+if os.path.isdir("/dev/shm"):
+    os.environ.setdefault("SHARED_TABLES_DIR", "/dev/shm/hcc-tables")
+# Shed bursts with 429/503 instead of queueing them (limits in admission.py), but
+# only once a trusted client header is configured: behind a proxy such as
+# Render's, remote_addr is the proxy and every user would share one client bucket.
+if os.environ.get("ADMISSION_CLIENT_HEADER"):
+    os.environ.setdefault("ADMISSION_ENABLED", "1")
+
+
+def on_starting(server):
+    # Snapshots left by an earlier run's workers would otherwise be merged into /metrics.
+    from metrics import MetricsRegistry
+
+    MetricsRegistry(os.environ["METRICS_DIR"]).clear_directory()
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from app import warm_up
+
+    warm_up()
+    gc.freeze()
+    server.log.info("application warmed up; %d objects frozen", gc.get_freeze_count())
+
+
+def post_worker_init(worker):
+    import app
+
+    # A no-op when the master already warmed up before forking.
+    app.warm_up()
+    # Workers reset inherited signal handlers, including the content reload one.
+    app.install_content_reload_signal()
+    app.app.config["GUNICORN_MASTER_PID"] = worker.ppid
+    # The master's pack is the one loaded before forking; an admin reload only
+    # reaches running workers, so a worker forked since then catches up here.
+    from content_pack import get_pack, reload_pack, source_changed
+
+    if source_changed():
+        previous = get_pack().content_version
+        try:
+            version = reload_pack().content_version
+        except (OSError, ValueError) as exc:
+            worker.log.error("content pack reload failed, keeping %s: %s", previous, exc)
+        else:
+            worker.log.info("content pack reloaded: %s -> %s", previous, version)
+
+
+def worker_exit(server, worker):
+    import app
+
+    # Write the last samples before the process goes; /metrics then folds them into the retained totals.
+    app.metrics_registry.maybe_flush(force=True)
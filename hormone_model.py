@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+HORMONE_KEYS = ("estrogen", "progesterone", "LH", "testosterone")
+
+
+@dataclass(frozen=True)
+class GaussianComponent:
+    offset: float
+    sigma: float
+    height: float = 1.0
+
+
+@dataclass(frozen=True)
+class HormoneModel:
+    """Gaussian hormone curves centred on the estimated ovulation day.
+
+    Each hormone is the maximum of its components, whose centres are
+    offsets from `max(min_peak_day, cycle_length - luteal_length)`. Levels
+    are scaled so the highest hormone on a given day reads 100.
+    """
+
+    name: str = field(compare=False)
+    curves: Tuple[Tuple[GaussianComponent, ...], ...]
+    luteal_length: float = 14.0
+    min_peak_day: float = 2.0
+
+    @classmethod
+    def from_dict(cls, name: str, data: Mapping[str, object]) -> "HormoneModel":
+        curves = data.get("curves") or {}
+        missing = [key for key in HORMONE_KEYS if not curves.get(key)]
+        if missing:
+            raise ValueError(f"激素模型 {name} 缺少曲线参数：{', '.join(missing)}。")
+        components = []
+        for key in HORMONE_KEYS:
+            parts = []
+            for entry in curves[key]:
+                if isinstance(entry, Mapping):
+                    component = GaussianComponent(**entry)
+                else:
+                    component = GaussianComponent(*entry)
+                if component.sigma <= 0:
+                    raise ValueError(f"激素模型 {name} 的 sigma 必须大于 0。")
+                parts.append(component)
+            components.append(tuple(parts))
+        return cls(
+            name=name,
+            curves=tuple(components),
+            luteal_length=float(data.get("luteal_length", 14.0)),
+            min_peak_day=float(data.get("min_peak_day", 2.0)),
+        )
+
+    def evaluate(self, cycle_days, cycle_lengths, luteal_lengths=None) -> np.ndarray:
+        """Scaled levels for broadcastable arrays of days, as an int array of shape (..., 4)."""
+        x = np.asarray(cycle_days, dtype=np.float64)
+        lengths = np.asarray(cycle_lengths, dtype=np.float64)
+        luteal = self.luteal_length if luteal_lengths is None else np.asarray(luteal_lengths, dtype=np.float64)
+        mu = np.maximum(self.min_peak_day, lengths - luteal)
+
+        columns = []
+        for components in self.curves:
+            value = None
+            for component in components:
+                centre = mu + component.offset
+                curve = component.height * np.exp(-((x - centre) ** 2) / (2 * component.sigma * component.sigma))
+                value = curve if value is None else np.maximum(value, curve)
+            columns.append(np.broadcast_to(value, np.broadcast(x, mu).shape))
+
+        raw = np.stack(columns, axis=-1)
+        base = raw.max(axis=-1, keepdims=True)
+        base[base == 0] = 1.0
+        return np.rint((raw / base) * 100).astype(np.int64)
+
+
+def model_fingerprint(model: HormoneModel) -> str:
+    """Stable digest of a model's parameters; models with equal curves match whatever their names."""
+    return hashlib.blake2b(
+        repr((model.curves, model.luteal_length, model.min_peak_day)).encode("utf-8"), digest_size=8
+    ).hexdigest()
+
+
+# Returns a prebuilt read-only array for (kind, model), or None to compute it locally.
+TableSource = Callable[[str, HormoneModel], Optional[np.ndarray]]
+_table_source: TableSource | None = None
+
+
+def set_table_source(source: TableSource | None) -> None:
+    """Serve compiled tables from `source` (see shared_tables.py); install it before tables are first used."""
+    global _default_table, _table_source
+    _table_source = source
+    compile_table.cache_clear()
+    _default_table = None
+
+
+def prebuilt_table(kind: str, model: HormoneModel, shape: Tuple[int, ...]) -> np.ndarray | None:
+    source = _table_source
+    if source is None:
+        return None
+    array = source(kind, model)
+    return array if array is not None and array.shape == shape else None
+
+
+def levels_array(model: HormoneModel, max_cycle_length: int) -> np.ndarray:
+    """Levels indexed by [cycle_length, cycle_day], shape (max + 1, max + 1, 4)."""
+    days = np.arange(max_cycle_length + 1)
+    lengths = np.arange(max_cycle_length + 1)
+    return model.evaluate(days[np.newaxis, :], lengths[:, np.newaxis])
+
+
+class CompiledHormoneTable:
+    """Levels for every (cycle_length, cycle_day) up to `max_cycle_length`.
+
+    A locally computed table is also kept as nested tuples, the fastest
+    per-call path. A table from a shared segment is read in place instead:
+    tuples would be a private copy in every worker, defeating the mapping.
+    """
+
+    def __init__(self, model: HormoneModel, max_cycle_length: int) -> None:
+        self.model = model
+        self.max_cycle_length = max_cycle_length
+        shape = (max_cycle_length + 1, max_cycle_length + 1, len(HORMONE_KEYS))
+        array = prebuilt_table("levels", model, shape)
+        self.shared = array is not None
+        if array is None:
+            array = levels_array(model, max_cycle_length)
+            array.setflags(write=False)
+        self.array = array
+        self._rows = None if self.shared else self._tuples()
+
+    def _tuples(self) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+        return tuple(tuple(map(tuple, per_length)) for per_length in self.array.tolist())
+
+    @property
+    def rows(self) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+        """Levels as nested tuples indexed [cycle_length][cycle_day]; built on first use for a shared table."""
+        if self._rows is None:
+            self._rows = self._tuples()
+        return self._rows
+
+    def levels(self, cycle_day: int, cycle_length: int) -> Dict[str, int]:
+        if 1 <= cycle_day <= cycle_length <= self.max_cycle_length:
+            rows = self._rows
+            if rows is None:
+                return dict(zip(HORMONE_KEYS, self.array[cycle_length, cycle_day].tolist()))
+            return dict(zip(HORMONE_KEYS, rows[cycle_length][cycle_day]))
+        return dict(zip(HORMONE_KEYS, self.model.evaluate(cycle_day, cycle_length).tolist()))
+
+
+@lru_cache(maxsize=8)
+def compile_table(model: HormoneModel, max_cycle_length: int) -> CompiledHormoneTable:
+    return CompiledHormoneTable(model, max_cycle_length)
+
+
+# The default model's table by max_cycle_length, so the hot path skips resolving
+# the name and hashing the model; named models go through compile_table's LRU.
+# Cleared whenever a model or the table source changes.
+_default_table: Tuple[int, CompiledHormoneTable] | None = None
+
+
+def model_table(name: str | None, max_cycle_length: int) -> CompiledHormoneTable:
+    """`compile_table(get_model(name), max_cycle_length)`, with the default model's table kept at hand."""
+    global _default_table
+    default = name is None or name == ""
+    cached = _default_table
+    if default and cached is not None and cached[0] == max_cycle_length:
+        return cached[1]
+    table = compile_table(get_model(name), max_cycle_length)
+    if default:
+        _default_table = (max_cycle_length, table)
+    return table
+
+
+DEFAULT_MODEL = HormoneModel.from_dict(
+    "default",
+    {
+        "curves": {
+            "estrogen": [[0.0, 2.0, 1.0], [6.0, 6.0, 0.5]],
+            "progesterone": [[5.0, 4.0, 1.0]],
+            "LH": [[0.0, 0.8, 1.0]],
+            "testosterone": [[0.0, 2.3, 0.4]],
+        }
+    },
+)
+
+REFERENCE_MODEL = HormoneModel.from_dict(
+    "reference",
+    {
+        "curves": {
+            "estrogen": [[0.0, 2.0, 1.0], [6.0, 6.0, 0.5]],
+            "progesterone": [[5.0, 4.0, 1.0]],
+            "LH": [[0.0, 0.9, 1.0]],
+            "testosterone": [[0.0, 2.5, 0.4]],
+        }
+    },
+)
+
+MODELS: Dict[str, HormoneModel] = {
+    DEFAULT_MODEL.name: DEFAULT_MODEL,
+    REFERENCE_MODEL.name: REFERENCE_MODEL,
+}
+
+
+def register_model(model: HormoneModel) -> None:
+    global _default_table
+    MODELS[model.name] = model
+    _default_table = None
+
+
+def load_models(path: str) -> Sequence[HormoneModel]:
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    models = [HormoneModel.from_dict(name, params) for name, params in data.items()]
+    for model in models:
+        register_model(model)
+    return models
+
+
+def get_model(name: str | None = None) -> HormoneModel:
+    if name is not None and not isinstance(name, str):
+        raise ValueError("激素模型名称需要是文本。")
+    key = name or os.environ.get("HORMONE_MODEL") or DEFAULT_MODEL.name
+    try:
+        return MODELS[key]
+    except KeyError as exc:
+        raise ValueError(f"未知的激素模型：{key}。") from exc
+
+
+if os.environ.get("HORMONE_MODELS_FILE"):
+    load_models(os.environ["HORMONE_MODELS_FILE"])
+
+
+__all__ = [
+    "CompiledHormoneTable",
+    "DEFAULT_MODEL",
+    "GaussianComponent",
+    "HORMONE_KEYS",
+    "HormoneModel",
+    "MODELS",
+    "REFERENCE_MODEL",
+    "compile_table",
+    "get_model",
+    "levels_array",
+    "load_models",
+    "model_fingerprint",
+    "model_table",
+    "prebuilt_table",
+    "register_model",
+    "set_table_source",
+]
@@ -0,0 +1,318 @@
+"""Request counters, latency histograms and per-stage timings.
+
+Each process keeps its own registry and, when a metrics directory is
+configured, periodically writes a snapshot file there, named by pid and
+start time. `/metrics` merges every snapshot in the directory, so counts
+aggregate across gunicorn workers without an external service. Snapshots
+of workers that have exited (recycled after max_requests, or crashed)
+are folded into one retained totals file, so their counts survive
+without the directory growing with every recycled worker.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import glob
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows runs no multi-process server here, so nothing is retired.
+    fcntl = None
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+
+HELP = {
+    "hcc_http_requests_total": ("counter", "HTTP requests handled, by route and status."),
+    "hcc_http_errors_total": ("counter", "HTTP requests answered with a 4xx/5xx status, by route and status."),
+    "hcc_http_request_duration_seconds": ("histogram", "Request latency by route."),
+    "hcc_stage_duration_seconds": ("histogram", "Time spent in each request stage, by route and stage."),
+    "hcc_admission_shed_total": ("counter", "Requests shed by admission control, by route and reason."),
+    "hcc_persistent_cache_lookups_total": ("counter", "Second-tier response cache lookups, by namespace and hit/miss."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+SNAPSHOT_PATTERN = "metrics-*.json"
+RETIRED_NAME = "metrics-retired.json"
+LOCK_NAME = ".metrics.lock"
+_SNAPSHOT_NAME = re.compile(r"metrics-(\d+)(?:-(\d+))?\.json$")
+
+_stages: ContextVar[List[Tuple[str, float]] | None] = ContextVar("hcc_stages", default=None)
+
+
+class MetricsRegistry:
+    def __init__(self, directory: str | None = None, flush_interval: float = 1.0) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._pid = 0
+        self._path = ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def inc(self, name: str, labels: Labels, amount: float = 1.0) -> None:
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def observe(self, name: str, labels: Labels, value: float, buckets: Sequence[float]) -> None:
+        key = (name, labels)
+        with self._lock:
+            self._buckets.setdefault(name, buckets)
+            counts = self._histograms.get(key)
+            if counts is None:
+                # One slot per bucket, then +Inf, sum and count.
+                counts = self._histograms[key] = [0.0] * (len(buckets) + 3)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(buckets)] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [[name, list(labels), list(counts)] for (name, labels), counts in self._histograms.items()],
+                "buckets": {name: list(bounds) for name, bounds in self._buckets.items()},
+            }
+
+    def maybe_flush(self, force: bool = False) -> None:
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        path = self._snapshot_path()
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(temporary, path)
+
+    def _snapshot_path(self) -> str:
+        pid = os.getpid()
+        if pid != self._pid:
+            # The start time keeps a reused pid from overwriting an exited worker's snapshot.
+            self._pid = pid
+            self._path = os.path.join(self.directory, f"metrics-{pid}-{time.time_ns()}.json")
+        return self._path
+
+    def collect(self) -> Dict[str, object]:
+        """Merge this process's live values with every worker snapshot on disk."""
+        if not self.directory:
+            return self.snapshot()
+        self.maybe_flush(force=True)
+        self.retire_exited()
+        totals = _Totals()
+        for path in glob.glob(os.path.join(self.directory, SNAPSHOT_PATTERN)):
+            data = _read_snapshot(path)
+            if data is not None:
+                totals.add(data)
+        return totals.snapshot()
+
+    def retire_exited(self) -> int:
+        """Fold the snapshots of exited processes into the retained totals; returns how many were folded."""
+        if not self.directory or fcntl is None:
+            return 0
+        newest: Dict[int, Tuple[int, str]] = {}
+        exited: List[str] = []
+        for path in glob.glob(os.path.join(self.directory, SNAPSHOT_PATTERN)):
+            match = _SNAPSHOT_NAME.search(path)
+            if match is None or path == self._path:
+                continue
+            pid, started = int(match.group(1)), int(match.group(2) or 0)
+            # Only the newest snapshot of a pid can belong to a running process.
+            previous = newest.get(pid)
+            if previous is None or started > previous[0]:
+                newest[pid] = (started, path)
+                if previous is not None:
+                    exited.append(previous[1])
+            else:
+                exited.append(path)
+        exited.extend(path for pid, (_, path) in newest.items() if not _process_alive(pid))
+        if not exited:
+            return 0
+
+        retired_path = os.path.join(self.directory, RETIRED_NAME)
+        with open(os.path.join(self.directory, LOCK_NAME), "a") as lock:
+            # Under the lock a snapshot is read and removed by exactly one process.
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            totals = _Totals()
+            retired = _read_snapshot(retired_path)
+            if retired is not None:
+                totals.add(retired)
+            folded = []
+            for path in exited:
+                data = _read_snapshot(path)
+                if data is not None:
+                    totals.add(data)
+                    folded.append(path)
+            if not folded:
+                return 0
+            temporary = f"{retired_path}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as handle:
+                json.dump(totals.snapshot(), handle)
+            os.replace(temporary, retired_path)
+            for path in folded:
+                os.remove(path)
+        return len(folded)
+
+    def render(self) -> str:
+        data = self.collect()
+        series: Dict[str, List[str]] = {}
+        for name, labels, value in sorted(data["counters"]):
+            series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, labels, counts in sorted(data["histograms"]):
+            bounds = data["buckets"].get(name, [])
+            lines = series.setdefault(name, [])
+            cumulative = 0.0
+            for bound, count in zip(list(bounds) + ["+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(list(labels) + [['le', le]])} {_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {counts[-2]!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_value(counts[-1])}")
+
+        output = []
+        for name in sorted(series):
+            kind, description = HELP.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {description}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(series[name])
+        return "\n".join(output) + "\n"
+
+    def clear_directory(self) -> None:
+        if not self.directory:
+            return
+        for path in glob.glob(os.path.join(self.directory, SNAPSHOT_PATTERN)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class _Totals:
+    """Sums of counters and histogram slots across snapshots."""
+
+    def __init__(self) -> None:
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self.buckets: Dict[str, List[float]] = {}
+
+    def add(self, data: Dict[str, object]) -> None:
+        self.buckets.update(data.get("buckets", {}))
+        for name, labels, value in data.get("counters", []):
+            key = (name, tuple(map(tuple, labels)))
+            self.counters[key] = self.counters.get(key, 0.0) + value
+        for name, labels, counts in data.get("histograms", []):
+            key = (name, tuple(map(tuple, labels)))
+            merged = self.histograms.get(key)
+            if merged is None:
+                self.histograms[key] = list(counts)
+            else:
+                self.histograms[key] = [left + right for left, right in zip(merged, counts)]
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "counters": [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+            "histograms": [[name, list(labels), counts] for (name, labels), counts in self.histograms.items()],
+            "buckets": self.buckets,
+        }
+
+
+def _read_snapshot(path: str) -> Dict[str, object] | None:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def start_stages() -> List[Tuple[str, float]]:
+    stages: List[Tuple[str, float]] = []
+    _stages.set(stages)
+    return stages
+
+
+def current_stages() -> List[Tuple[str, float]] | None:
+    return _stages.get()
+
+
+def stop_stages() -> None:
+    _stages.set(None)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    stages = _stages.get()
+    if stages is not None:
+        stages.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    if _stages.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def server_timing_header(stages: Sequence[Tuple[str, float]], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in stages]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+__all__ = [
+    "LATENCY_BUCKETS",
+    "MetricsRegistry",
+    "STAGE_BUCKETS",
+    "current_stages",
+    "record_stage",
+    "server_timing_header",
+    "stage",
+    "start_stages",
+    "stop_stages",
+]
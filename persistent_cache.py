@@ -0,0 +1,174 @@
+"""Second-tier response cache on SQLite, shared by every worker on a host.
+
+Sits behind the in-process ResponseCache: a miss there looks here before
+recomputing, so a restarted or newly forked worker starts warm. Entries
+are keyed by a digest of the normalized inputs and a result version (the
+calculator source, the registered hormone models and the content pack),
+so a deploy that changes any of them stops matching old entries, which
+then age out. Expired entries and anything over the size cap are pruned
+every few hundred writes.
+
+Any SQLite error (a locked or missing file) counts as a miss; the cache
+never fails a request.
+
+    python persistent_cache.py stats --path /tmp/hcc-cache.db
+    python persistent_cache.py prune --path /tmp/hcc-cache.db
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Hashable, List
+
+from content_pack import ContentPack
+from hormone_model import MODELS, model_fingerprint
+
+DEFAULT_TTL = 86400.0
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+PRUNE_INTERVAL = 256
+# Pruning frees a little more than the excess so it does not run on every write.
+PRUNE_TARGET = 0.9
+# Modules whose code determines response bodies.
+VERSIONED_SOURCES = ("calculator.py", "hormone_model.py", "serialization.py", "uncertainty.py")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key BLOB PRIMARY KEY,
+        body BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        expires REAL NOT NULL
+    ) WITHOUT ROWID
+"""
+SCHEMA_INDEX = "CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)"
+SELECT_BODY = "SELECT body FROM responses WHERE key = ? AND expires > ?"
+UPSERT_BODY = "INSERT OR REPLACE INTO responses (key, body, size, expires) VALUES (?, ?, ?, ?)"
+DELETE_EXPIRED = "DELETE FROM responses WHERE expires <= ?"
+SELECT_TOTALS = "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+DELETE_OLDEST = "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY expires LIMIT ?)"
+
+_code_digest: str | None = None
+
+
+def code_version() -> str:
+    """Digest of the modules in VERSIONED_SOURCES, computed once per process."""
+    global _code_digest
+    if _code_digest is None:
+        digest = hashlib.blake2b(digest_size=8)
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in VERSIONED_SOURCES:
+            with open(os.path.join(directory, name), "rb") as handle:
+                digest.update(handle.read())
+        _code_digest = digest.hexdigest()
+    return _code_digest
+
+
+def result_version(pack: ContentPack) -> str:
+    """Version every cached body depends on: code, registered models and content."""
+    models = ",".join(sorted(f"{name}={model_fingerprint(model)}" for name, model in MODELS.items()))
+    models_digest = hashlib.blake2b(models.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{code_version()}:{models_digest}:{pack.content_version}"
+
+
+class PersistentCache:
+    """Serialized response bodies by key, with a TTL and a total size cap."""
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._writes = 0
+        self._local = threading.local()
+        connection = self.connection()
+        with connection:
+            connection.execute(SCHEMA)
+            connection.execute(SCHEMA_INDEX)
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use and again after a fork."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            # A short busy timeout: waiting long on a lock costs more than recomputing.
+            connection = sqlite3.connect(self.path, timeout=0.05, cached_statements=16)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    @staticmethod
+    def digest(key: Hashable) -> bytes:
+        """Keys are tuples of strings and numbers, whose repr is stable across processes."""
+        return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: Hashable) -> bytes | None:
+        try:
+            row = self.connection().execute(SELECT_BODY, (self.digest(key), time.time())).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: Hashable, body: bytes, ttl: float | None = None) -> None:
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        connection = self.connection()
+        try:
+            with connection:
+                connection.execute(UPSERT_BODY, (self.digest(key), body, len(body), expires))
+        except sqlite3.Error:
+            self.errors += 1
+            return
+        self._writes += 1
+        if self._writes % PRUNE_INTERVAL == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drop expired entries, then the soonest-expiring ones while over the size cap."""
+        connection = self.connection()
+        try:
+            with connection:
+                removed = connection.execute(DELETE_EXPIRED, (time.time(),)).rowcount
+                count, total = connection.execute(SELECT_TOTALS).fetchone()
+                if total > self.max_bytes and count:
+                    excess = total - self.max_bytes * PRUNE_TARGET
+                    removed += connection.execute(DELETE_OLDEST, (int(excess * count / total) + 1,)).rowcount
+        except sqlite3.Error:
+            self.errors += 1
+            return 0
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        count, total = self.connection().execute(SELECT_TOTALS).fetchone()
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Persistent response cache utilities.")
+    parser.add_argument("command", choices=("stats", "prune"))
+    default_path = os.environ.get("PERSISTENT_CACHE_PATH")
+    parser.add_argument("--path", default=default_path, required=not default_path, help="cache database file")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    args = parser.parse_args(argv)
+
+    cache = PersistentCache(args.path, max_bytes=args.max_bytes)
+    if args.command == "prune":
+        print(f"removed {cache.prune()} entries")
+    print(json.dumps(cache.stats(), indent=2))
+    return 0
+
+
+__all__ = ["PersistentCache", "code_version", "result_version"]
+
+if __name__ == "__main__":
+    sys.exit(main())
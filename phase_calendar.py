@@ -0,0 +1,241 @@
+"""Phase calendar queries answered with modular arithmetic instead of day-by-day scans.
+
+A cycle state (cycle_length, menses_days) is compiled once into its phase
+segments and per-phase prefix counts, using the same boundaries as
+`calculate_cycle_details`. Next-window and phase-day-count queries then
+cost a handful of integer operations whatever the date range.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Mapping, Tuple
+
+from calculator import (
+    DEFAULT_CYCLE_LENGTH,
+    DEFAULT_MENSES_DAYS,
+    MAX_CYCLE_LENGTH,
+    PHASE_KEYS,
+    PHASE_NAMES,
+    _check_range_end,
+    _parse_date,
+    _resolve_observation,
+    get_lookup_table,
+)
+from hormone_model import HORMONE_KEYS, model_table
+
+DEFAULT_TIMELINE_DAYS = 365
+MAX_TIMELINE_DAYS = 5 * 366
+
+Segment = Tuple[str, int, int]
+
+
+@dataclass(frozen=True)
+class CycleCalendar:
+    """Phase layout of one cycle state; positions are 0-based cycle days."""
+
+    cycle_length: int
+    menses_days: int
+    segments: Tuple[Segment, ...]
+    prefix: Mapping[str, Tuple[int, ...]]
+
+    @classmethod
+    def build(cls, cycle_length: int, menses_days: int) -> "CycleCalendar":
+        table = get_lookup_table()
+        phases = [table.phase_key(day, cycle_length, menses_days) for day in range(1, cycle_length + 1)]
+
+        segments: List[Segment] = []
+        for position, phase_key in enumerate(phases):
+            if segments and segments[-1][0] == phase_key:
+                segments[-1] = (phase_key, segments[-1][1], position)
+            else:
+                segments.append((phase_key, position, position))
+
+        prefix = {}
+        for phase_key in PHASE_KEYS:
+            running = [0]
+            for current in phases:
+                running.append(running[-1] + (current == phase_key))
+            prefix[phase_key] = tuple(running)
+        return cls(cycle_length, menses_days, tuple(segments), prefix)
+
+    def segment_index(self, position: int) -> int:
+        for index, segment in enumerate(self.segments):
+            if segment[1] <= position <= segment[2]:
+                return index
+        raise ValueError(position)
+
+    def next_transition(self, position: int) -> Tuple[int, int]:
+        """Days until the phase after the one at `position` starts, and that segment's index."""
+        index = self.segment_index(position)
+        return self.segments[index][2] + 1 - position, (index + 1) % len(self.segments)
+
+    def count(self, phase_key: str, position: int, days: int) -> int:
+        """Days of `phase_key` among `days` consecutive days starting at `position`."""
+        prefix = self.prefix[phase_key]
+        length = self.cycle_length
+        full, rest = divmod(days, length)
+        end = position + rest
+        if end <= length:
+            partial = prefix[end] - prefix[position]
+        else:
+            partial = prefix[length] - prefix[position] + prefix[end - length]
+        return full * prefix[length] + partial
+
+    def next_start(self, phase_key: str, position: int) -> Tuple[int, Segment] | None:
+        """Days until the first `phase_key` segment starting at or after `position`, with that segment."""
+        starts = [segment for segment in self.segments if segment[0] == phase_key]
+        if not starts:
+            return None
+        for segment in starts:
+            if segment[1] >= position:
+                return segment[1] - position, segment
+        return starts[0][1] + self.cycle_length - position, starts[0]
+
+
+@lru_cache(maxsize=None)
+def get_calendar(cycle_length: int, menses_days: int) -> CycleCalendar:
+    return CycleCalendar.build(cycle_length, menses_days)
+
+
+def _window(phase_key: str, start: date, first: int, last: int, days_until: int) -> Dict[str, object]:
+    return {
+        "phase": PHASE_NAMES[phase_key],
+        "phase_key": phase_key,
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=last - first)).isoformat(),
+        "days_until": days_until,
+    }
+
+
+def next_phase_windows(
+    last_period_date: str,
+    *,
+    from_date: str | None = None,
+    cycle_length: int = DEFAULT_CYCLE_LENGTH,
+    menses_days: int = DEFAULT_MENSES_DAYS,
+    phase: str | None = None,
+) -> Dict[str, object]:
+    """Current phase, the next phase change and the next window of each phase.
+
+    A phase's next window is the first one starting on or after `from_date`
+    (default: today); a window already in progress is reported as `current`.
+    """
+    if phase is not None and (not isinstance(phase, str) or phase not in PHASE_NAMES):
+        raise ValueError(f"未知的周期阶段：{phase}。")
+    observed, cycle_day = _resolve_observation(last_period_date, from_date, cycle_length, menses_days)
+    # Every window reported ends within two cycles of `observed`.
+    _check_range_end(observed, 2 * cycle_length)
+    calendar = get_calendar(cycle_length, menses_days)
+    position = cycle_day - 1
+
+    phase_key, first, last = calendar.segments[calendar.segment_index(position)]
+    current = _window(phase_key, observed - timedelta(days=position - first), first, last, 0)
+    days_until, next_index = calendar.next_transition(position)
+    next_key, next_first, next_last = calendar.segments[next_index]
+    next_transition = _window(next_key, observed + timedelta(days=days_until), next_first, next_last, days_until)
+
+    windows: Dict[str, object] = {}
+    for key in (phase,) if phase else PHASE_KEYS:
+        found = calendar.next_start(key, position)
+        if found is None:
+            windows[key] = None
+            continue
+        offset, (_, start, end) = found
+        windows[key] = _window(key, observed + timedelta(days=offset), start, end, offset)
+
+    return {
+        "from_date": observed.isoformat(),
+        "cycle_day": cycle_day,
+        "cycle_length": cycle_length,
+        "current": current,
+        "next_transition": next_transition,
+        "phases": windows,
+    }
+
+
+def count_phase_days(
+    last_period_date: str,
+    *,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    cycle_length: int = DEFAULT_CYCLE_LENGTH,
+    menses_days: int = DEFAULT_MENSES_DAYS,
+) -> Dict[str, object]:
+    """Number of days of each phase between `start_date` and `end_date`, inclusive."""
+    if not end_date:
+        raise ValueError("请填写结束日期。")
+    start, cycle_day = _resolve_observation(last_period_date, start_date or last_period_date, cycle_length, menses_days)
+    days = (_parse_date(end_date) - start).days + 1
+    if days < 1:
+        raise ValueError("结束日期不能早于开始日期。")
+
+    calendar = get_calendar(cycle_length, menses_days)
+    return {
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=days - 1)).isoformat(),
+        "days": days,
+        "counts": {phase_key: calendar.count(phase_key, cycle_day - 1, days) for phase_key in PHASE_KEYS},
+    }
+
+
+def phase_timeline(
+    last_period_date: str,
+    *,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    days: int | None = None,
+    cycle_length: int = DEFAULT_CYCLE_LENGTH,
+    menses_days: int = DEFAULT_MENSES_DAYS,
+    model: str | None = None,
+) -> Dict[str, object]:
+    """Phase timeline as run-length segments plus one hormone curve for the cycle length.
+
+    Segments are `[phase_key, start_date, length]`, at most five per cycle.
+    Hormone levels for a date are `hormones[key][cycle_day - 1]`, where the
+    cycle day advances from `start_cycle_day` and wraps at `cycle_length`.
+    """
+    start, cycle_day = _resolve_observation(
+        last_period_date, start_date or last_period_date, cycle_length, menses_days
+    )
+    if end_date:
+        span = (_parse_date(end_date) - start).days + 1
+        if span < 1:
+            raise ValueError("结束日期不能早于开始日期。")
+    else:
+        span = DEFAULT_TIMELINE_DAYS if days is None else days
+        if span < 1:
+            raise ValueError("预测天数至少为 1 天。")
+    if span > MAX_TIMELINE_DAYS:
+        raise ValueError(f"单次最多查询 {MAX_TIMELINE_DAYS} 天。")
+    _check_range_end(start, span)
+
+    calendar = get_calendar(cycle_length, menses_days)
+    curves = model_table(model, MAX_CYCLE_LENGTH).array[cycle_length, 1 : cycle_length + 1]
+
+    segments = []
+    index = calendar.segment_index(cycle_day - 1)
+    position = cycle_day - 1
+    offset = 0
+    while offset < span:
+        phase_key, _, last = calendar.segments[index]
+        length = min(last + 1 - position, span - offset)
+        segments.append([phase_key, (start + timedelta(days=offset)).isoformat(), length])
+        offset += length
+        index = (index + 1) % len(calendar.segments)
+        position = calendar.segments[index][1]
+
+    return {
+        "cycle_length": cycle_length,
+        "menses_days": menses_days,
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=span - 1)).isoformat(),
+        "start_cycle_day": cycle_day,
+        "phases": {phase_key: PHASE_NAMES[phase_key] for phase_key in PHASE_KEYS},
+        "segments": segments,
+        "hormones": {key: curves[:, column].tolist() for column, key in enumerate(HORMONE_KEYS)},
+    }
+
+
+__all__ = ["CycleCalendar", "count_phase_days", "get_calendar", "next_phase_windows", "phase_timeline"]
@@ -0,0 +1,252 @@
+"""Phase-change reminders driven by a priority queue of next-transition dates.
+
+Each user is scheduled once at their next phase transition (from
+phase_calendar.py). A daily run pops only the users who are due and
+reschedules them from their new phase, so the work per day is
+proportional to the reminders sent, not to the population. State is
+saved to a local JSON file so a restart resumes without recomputing.
+
+    python reminder_scheduler.py run users.ndjson --state reminders.json
+    python reminder_scheduler.py simulate --users 100000 --days 365
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+import heapq
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, IO, Iterator, List, Tuple
+
+from calculator import (
+    DEFAULT_CYCLE_LENGTH,
+    DEFAULT_MENSES_DAYS,
+    MAX_CYCLE_LENGTH,
+    MAX_MENSES_DAYS,
+    MIN_CYCLE_LENGTH,
+    MIN_MENSES_DAYS,
+    PHASE_NAMES,
+    _resolve_observation,
+    cycle_numbers_from_payload,
+)
+from phase_calendar import get_calendar
+
+STATE_VERSION = 1
+
+# (last period ordinal, cycle_length, menses_days, due ordinal)
+UserState = Tuple[int, int, int, int]
+
+
+class ReminderScheduler:
+    """Users ordered by the date of their next phase transition.
+
+    Re-adding or removing a user leaves its old heap entry behind; stale
+    entries are skipped when popped and the heap is rebuilt once they
+    outnumber the live users.
+    """
+
+    def __init__(self) -> None:
+        self._users: Dict[str, UserState] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def add(
+        self,
+        user_id: str,
+        last_period_date: str,
+        today: date,
+        cycle_length: int = DEFAULT_CYCLE_LENGTH,
+        menses_days: int = DEFAULT_MENSES_DAYS,
+    ) -> date:
+        """Schedule (or reschedule) a user at their first transition after `today`."""
+        start, _ = _resolve_observation(last_period_date, last_period_date, cycle_length, menses_days)
+        due = self._next_due(start.toordinal(), cycle_length, menses_days, today.toordinal())
+        self._push(user_id, (start.toordinal(), cycle_length, menses_days, due))
+        return date.fromordinal(due)
+
+    def remove(self, user_id: str) -> bool:
+        return self._users.pop(user_id, None) is not None
+
+    def next_due(self) -> date | None:
+        self._drop_stale()
+        return date.fromordinal(self._heap[0][0]) if self._heap else None
+
+    def pop_due(self, today: date) -> List[Dict[str, object]]:
+        """Reminders for every user whose phase changed on or before `today`.
+
+        A user who missed several transitions (e.g. the scheduler was down)
+        gets a single reminder for the phase they are in today.
+        """
+        today_ordinal = today.toordinal()
+        reminders = []
+        while self._heap and self._heap[0][0] <= today_ordinal:
+            due, user_id = heapq.heappop(self._heap)
+            state = self._users.get(user_id)
+            if state is None or state[3] != due:
+                continue
+            last_ordinal, cycle_length, menses_days, _ = state
+            calendar = get_calendar(cycle_length, menses_days)
+            position = (today_ordinal - last_ordinal) % cycle_length
+            phase_key, first, last = calendar.segments[calendar.segment_index(position)]
+            reminders.append(
+                {
+                    "user_id": user_id,
+                    "date": date.fromordinal(today_ordinal - (position - first)).isoformat(),
+                    "phase": PHASE_NAMES[phase_key],
+                    "phase_key": phase_key,
+                }
+            )
+            # The next transition is the day after the current phase ends.
+            next_due = today_ordinal + last + 1 - position
+            self._push(user_id, (last_ordinal, cycle_length, menses_days, next_due))
+        return reminders
+
+    @staticmethod
+    def _next_due(last_ordinal: int, cycle_length: int, menses_days: int, today_ordinal: int) -> int:
+        position = (today_ordinal - last_ordinal) % cycle_length
+        offset, _ = get_calendar(cycle_length, menses_days).next_transition(position)
+        return today_ordinal + offset
+
+    def _push(self, user_id: str, state: UserState) -> None:
+        self._users[user_id] = state
+        heapq.heappush(self._heap, (state[3], user_id))
+        if len(self._heap) > 2 * len(self._users) + 64:
+            self._heap = [(due, user_id) for user_id, (_, _, _, due) in self._users.items()]
+            heapq.heapify(self._heap)
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            due, user_id = self._heap[0]
+            state = self._users.get(user_id)
+            if state is not None and state[3] == due:
+                return
+            heapq.heappop(self._heap)
+
+    def save(self, path: str) -> None:
+        """Write the schedule atomically; loading it needs no phase computation."""
+        state = {
+            "version": STATE_VERSION,
+            "users": [[user_id, *values] for user_id, values in self._users.items()],
+        }
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(state, handle, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ReminderScheduler":
+        with open(path, encoding="utf-8") as handle:
+            state = json.load(handle)
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"unsupported reminder state version: {state.get('version')}")
+        scheduler = cls()
+        scheduler._users = {user_id: tuple(values) for user_id, *values in state["users"]}
+        scheduler._heap = [(due, user_id) for user_id, (_, _, _, due) in scheduler._users.items()]
+        heapq.heapify(scheduler._heap)
+        return scheduler
+
+
+def _read_users(handle: IO[str]) -> Iterator[Tuple[int, Dict[str, object] | str]]:
+    """Yield (line number, record); a line that is not a JSON object yields why it was skipped."""
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, "invalid JSON"
+            continue
+        yield line_number, record if isinstance(record, dict) else "not a JSON object"
+
+
+def run(args: argparse.Namespace) -> int:
+    today = date.fromisoformat(args.today) if args.today else date.today()
+    if os.path.exists(args.state):
+        scheduler = ReminderScheduler.load(args.state)
+    else:
+        scheduler = ReminderScheduler()
+
+    if args.users:
+        # Yesterday, so users whose phase changes today are reminded in this run.
+        since = today - timedelta(days=1)
+        with open(args.users, encoding="utf-8") as handle:
+            for line_number, record in _read_users(handle):
+                if isinstance(record, str):
+                    print(f"skipped line {line_number}: {record}", file=sys.stderr)
+                    continue
+                try:
+                    cycle_length, menses_days = cycle_numbers_from_payload(record)
+                    # _resolve_observation rejects a last_date that is not a string.
+                    scheduler.add(str(record["id"]), record.get("last_date"), since, cycle_length, menses_days)
+                except (KeyError, ValueError) as exc:
+                    print(f"skipped line {line_number} ({record.get('id')}): {exc}", file=sys.stderr)
+
+    for reminder in scheduler.pop_due(today):
+        sys.stdout.write(json.dumps(reminder, ensure_ascii=False) + "\n")
+    scheduler.save(args.state)
+    return 0
+
+
+def simulate(users: int, days: int, start: date, seed: int) -> Dict[str, float]:
+    """Replay `days` days for a synthetic population and measure the scheduler."""
+    rng = random.Random(seed)
+    scheduler = ReminderScheduler()
+    started = time.perf_counter()
+    for user_id in range(users):
+        last = start - timedelta(days=rng.randrange(MAX_CYCLE_LENGTH))
+        scheduler.add(
+            str(user_id),
+            last.isoformat(),
+            start - timedelta(days=1),
+            rng.randint(MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH),
+            rng.randint(MIN_MENSES_DAYS, MAX_MENSES_DAYS),
+        )
+    loaded = time.perf_counter()
+
+    reminders = 0
+    for offset in range(days):
+        reminders += len(scheduler.pop_due(start + timedelta(days=offset)))
+    finished = time.perf_counter()
+
+    replay = finished - loaded
+    return {
+        "users": users,
+        "days": days,
+        "reminders": reminders,
+        "schedule_seconds": round(loaded - started, 3),
+        "replay_seconds": round(replay, 3),
+        "reminders_per_second": round(reminders / replay) if replay else 0.0,
+        "user_days_per_second": round(users * days / replay) if replay else 0.0,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Phase-change reminder scheduler.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="pop today's reminders as NDJSON and save the schedule")
+    run_parser.add_argument("users", nargs="?", help="NDJSON of users to add or update (id, last_date, cycle_length, menses_days)")
+    run_parser.add_argument("--state", default="reminders.json", help="schedule file (default: reminders.json)")
+    run_parser.add_argument("--today", help="YYYY-MM-DD, default today")
+
+    simulate_parser = commands.add_parser("simulate", help="replay a synthetic population and report throughput")
+    simulate_parser.add_argument("--users", type=int, default=100000)
+    simulate_parser.add_argument("--days", type=int, default=365)
+    simulate_parser.add_argument("--start", default="2024-01-01")
+    simulate_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return run(args)
+    stats = simulate(args.users, args.days, date.fromisoformat(args.start), args.seed)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import hashlib
+from threading import Lock
+from typing import Dict, Hashable
+
+from serialization import compress
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    variants: Dict[str, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+    def encoded(self, encoding: str | None) -> bytes:
+        """Body for a content encoding; compressed variants are computed once per entry."""
+        if encoding is None:
+            return self.body
+        body = self.variants.get(encoding)
+        if body is None:
+            body = self.variants[encoding] = compress(self.body, encoding)
+        return body
+
+
+class ResponseCache:
+    """Bounded LRU of serialized response bodies with strong ETags."""
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body=body, etag=hashlib.blake2b(body, digest_size=16).hexdigest())
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = ["CachedResponse", "ResponseCache"]
@@ -0,0 +1,117 @@
+"""UTF-8 JSON encoding from pre-serialized content fragments, and response compression."""
+from __future__ import annotations
+
+import gzip
+import json
+from types import MappingProxyType
+from typing import Dict, Iterable, Tuple
+import zlib
+
+from flask import Request
+
+COMPRESSION_MIN_SIZE = 512
+ENCODINGS = ("gzip", "deflate")
+
+
+def _plain(value: object) -> object:
+    # Content pack mappings are read-only proxies.
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value: object) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_plain).encode("utf-8")
+
+
+DETAIL_KEYS = frozenset(
+    ("cycle_day", "cycle_length", "phase", "phase_key", "hormones", "symptoms", "advice", "observed_date")
+)
+_DETAIL_TEMPLATE = (
+    b'{"cycle_day":%d,"cycle_length":%d,"phase":%b,"phase_key":%b,'
+    b'"hormones":{"estrogen":%d,"progesterone":%d,"LH":%d,"testosterone":%d},'
+    b'"symptoms":%b,"advice":%b,"observed_date":%b}'
+)
+
+
+class FragmentEncoder:
+    """Encode calculator results as UTF-8 JSON assembled from pre-serialized fragments.
+
+    The symptom lists and advice variants handed out by calculator.py are
+    serialized once; a cycle-details result is then spliced together from
+    those fragments and a few formatted numbers instead of re-encoding the
+    long advice strings. Fragments are keyed by object identity, so any
+    other object falls back to `json.dumps`.
+    """
+
+    def __init__(self, content: Iterable[object] = ()) -> None:
+        self._fragments: Dict[int, Tuple[object, bytes]] = {}
+        self._strings: Dict[str, bytes] = {}
+        for value in content:
+            self._fragments[id(value)] = (value, _dumps(value))
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    def encode(self, value: object) -> bytes:
+        return _dumps(value) + b"\n"
+
+    def encode_details(self, result: Dict[str, object]) -> bytes:
+        return self._details(result) + b"\n"
+
+    def encode_batch(self, results: Iterable[Dict[str, object]]) -> bytes:
+        return b'{"results":[' + b",".join(self._details(result) for result in results) + b"]}\n"
+
+    def _fragment(self, value: object) -> bytes:
+        fragment = self._fragments.get(id(value))
+        if fragment is not None and fragment[0] is value:
+            return fragment[1]
+        return _dumps(value)
+
+    def _string(self, value: str) -> bytes:
+        encoded = self._strings.get(value)
+        if encoded is None:
+            encoded = self._strings[value] = _dumps(value)
+        return encoded
+
+    def _details(self, result: Dict[str, object]) -> bytes:
+        if result.keys() != DETAIL_KEYS:
+            return _dumps(result)
+        hormones = result["hormones"]
+        try:
+            return _DETAIL_TEMPLATE % (
+                result["cycle_day"],
+                result["cycle_length"],
+                self._string(result["phase"]),
+                self._string(result["phase_key"]),
+                hormones["estrogen"],
+                hormones["progesterone"],
+                hormones["LH"],
+                hormones["testosterone"],
+                self._fragment(result["symptoms"]),
+                self._fragment(result["advice"]),
+                _dumps(result["observed_date"]),
+            )
+        except (KeyError, TypeError):
+            return _dumps(result)
+
+
+def negotiate_encoding(request: Request) -> str | None:
+    best = None
+    best_quality = 0.0
+    for encoding in ENCODINGS:
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == "deflate":
+        return zlib.compress(body, 6)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+__all__ = ["COMPRESSION_MIN_SIZE", "DETAIL_KEYS", "ENCODINGS", "FragmentEncoder", "compress", "negotiate_encoding"]
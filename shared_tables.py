@@ -0,0 +1,210 @@
+"""Precomputed model tables in one memory-mapped segment shared by every worker.
+
+`publish` builds the hormone tables of every registered model into a
+segment file named after its content digest and atomically points
+`current` at it. `attach` maps the current segment read-only and exposes
+its arrays as zero-copy NumPy views, so all processes share one copy in
+the page cache: gunicorn workers forked after a preload inherit the
+master's mapping, and independently started ones map the same file.
+`install` plugs a segment into hormone_model so `compile_table` and the
+uncertainty cube read from it instead of computing their own copies.
+
+A model update publishes a new segment under a new name; mapped segments
+are never modified, so running processes keep a consistent version until
+they restart and attach to the new one.
+
+    python shared_tables.py publish --dir /dev/shm/hcc-tables
+    python shared_tables.py info --dir /dev/shm/hcc-tables
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+from calculator import MAX_CYCLE_LENGTH
+from hormone_model import MODELS, HormoneModel, levels_array, model_fingerprint, set_table_source
+from uncertainty import build_hormone_cube
+
+SEGMENT_MAGIC = b"HCCTBL01"
+POINTER_NAME = "current"
+SEGMENT_PREFIX = "tables-"
+ALIGNMENT = 64
+_HEADER_SIZE = struct.Struct("<I")
+
+
+def build_tables(models: Iterable[HormoneModel]) -> Dict[str, np.ndarray]:
+    arrays = {}
+    for model in models:
+        key = model_fingerprint(model)
+        arrays[f"levels/{key}"] = levels_array(model, MAX_CYCLE_LENGTH)
+        arrays[f"luteal_cube/{key}"] = build_hormone_cube(model)
+    return arrays
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class SharedTables:
+    """A read-only mapping of one published segment."""
+
+    __slots__ = ("path", "version", "models", "arrays", "nbytes", "_map")
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        prefix = len(SEGMENT_MAGIC) + _HEADER_SIZE.size
+        if self._map[: len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a table segment")
+        (header_size,) = _HEADER_SIZE.unpack_from(self._map, len(SEGMENT_MAGIC))
+        header = json.loads(self._map[prefix : prefix + header_size])
+        data_start = _aligned(prefix + header_size)
+
+        arrays = {}
+        for name, (dtype, shape, offset) in header["arrays"].items():
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
+            arrays[name] = np.frombuffer(self._map, dtype, count, data_start + offset).reshape(shape)
+        self.path = path
+        self.version: str = header["version"]
+        self.models: Mapping[str, str] = header["models"]
+        self.arrays: Mapping[str, np.ndarray] = arrays
+        self.nbytes = len(self._map)
+
+    def lookup(self, kind: str, model: HormoneModel) -> np.ndarray | None:
+        return self.arrays.get(f"{kind}/{model_fingerprint(model)}")
+
+    def covers(self, models: Iterable[HormoneModel]) -> bool:
+        return all(model_fingerprint(model) in self.models for model in models)
+
+
+def _write_atomic(path: str, chunks: Iterable[bytes]) -> None:
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+    os.replace(temporary, path)
+
+
+def publish(directory: str, models: Iterable[HormoneModel] | None = None) -> str:
+    """Write the tables of `models` (default: every registered model) and make them current.
+
+    Returns the segment path. Publishing identical tables again reuses the
+    existing segment; older segments are unlinked, which leaves existing
+    mappings of them intact.
+    """
+    unique = {model_fingerprint(model): model for model in (MODELS.values() if models is None else models)}
+    arrays = build_tables(unique.values())
+
+    layout: Dict[str, Tuple[str, List[int], int]] = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = (array.dtype.str, list(array.shape), offset)
+        offset = _aligned(offset + array.nbytes)
+    digest = hashlib.blake2b(json.dumps(layout, sort_keys=True).encode("utf-8"), digest_size=16)
+    for array in arrays.values():
+        digest.update(np.ascontiguousarray(array).tobytes())
+    version = digest.hexdigest()
+
+    header = json.dumps(
+        {"version": version, "models": {key: model.name for key, model in unique.items()}, "arrays": layout},
+        sort_keys=True,
+    ).encode("utf-8")
+    prefix = SEGMENT_MAGIC + _HEADER_SIZE.pack(len(header)) + header
+
+    def chunks() -> Iterable[bytes]:
+        yield prefix + bytes(_aligned(len(prefix)) - len(prefix))
+        for name, array in arrays.items():
+            data = np.ascontiguousarray(array).tobytes()
+            yield data + bytes(_aligned(len(data)) - len(data))
+
+    os.makedirs(directory, exist_ok=True)
+    segment = f"{SEGMENT_PREFIX}{version}.bin"
+    path = os.path.join(directory, segment)
+    if not os.path.exists(path):
+        _write_atomic(path, chunks())
+    _write_atomic(os.path.join(directory, POINTER_NAME), [segment.encode("ascii")])
+
+    for name in os.listdir(directory):
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(".bin") and name != segment:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    return path
+
+
+def attach(directory: str) -> SharedTables | None:
+    """Map the current segment, or None when nothing has been published."""
+    # A second try covers the pointer moving on between reading it and opening the segment.
+    for _ in range(2):
+        try:
+            with open(os.path.join(directory, POINTER_NAME), encoding="ascii") as handle:
+                segment = handle.read().strip()
+            if not segment.startswith(SEGMENT_PREFIX) or os.sep in segment:
+                raise ValueError(f"invalid table pointer {segment!r}")
+            return SharedTables(os.path.join(directory, segment))
+        except FileNotFoundError:
+            continue
+    return None
+
+
+_installed: SharedTables | None = None
+
+
+def install(directory: str) -> SharedTables:
+    """Serve model tables from the current segment, publishing one first if it lacks a registered model."""
+    global _installed
+    tables = attach(directory)
+    if tables is None or not tables.covers(MODELS.values()):
+        publish(directory)
+        tables = attach(directory)
+        if tables is None:
+            raise OSError(f"no table segment in {directory}")
+    set_table_source(tables.lookup)
+    _installed = tables
+    return tables
+
+
+def installed() -> SharedTables | None:
+    return _installed
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Shared model table segments.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    default_dir = os.environ.get("SHARED_TABLES_DIR")
+    for name, help_text in (
+        ("publish", "build tables for every registered model"),
+        ("info", "describe the current segment"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--dir", default=default_dir, required=not default_dir, help="segment directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        print(publish(args.dir))
+        return 0
+    tables = attach(args.dir)
+    if tables is None:
+        print(f"no table segment in {args.dir}", file=sys.stderr)
+        return 1
+    print(f"{tables.path}  version {tables.version}  {tables.nbytes} bytes")
+    for name, array in sorted(tables.arrays.items()):
+        model_name = tables.models[name.split("/")[1]]
+        print(f"  {name:<32} {model_name:<12} {array.dtype} {array.shape} {array.nbytes} bytes")
+    return 0
+
+
+__all__ = ["SharedTables", "attach", "install", "installed", "publish"]
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+const form = document.getElementById("cycle-form");
+const resultEl = document.getElementById("result");
+const observeInput = document.getElementById("observe_date");
+const lastInput = document.getElementById("last_date");
+const todayStr = new Date().toISOString().split("T")[0];
+if (!observeInput.value) {
+  observeInput.value = todayStr;
+}
+if (!lastInput.value) {
+  lastInput.max = todayStr;
+}
+
+function renderAdvice(advice) {
+  if (!advice) return "";
+  const list =
+    advice.items || advice.tips
+      ? `<ul>${(advice.items || advice.tips)
+          .map((item) => `<li>${item}</li>`)
+          .join("")}</ul>`
+      : "";
+  const phrases = advice.phrases
+    ? `<div class="small"><strong>示例表达：</strong><ul>${advice.phrases
+        .map((p) => `<li>${p}</li>`)
+        .join("")}</ul></div>`
+    : "";
+  return `
+    <div class="advice">
+      <p><strong>建议：</strong></p>
+      <p><em>${advice.headline || ""}</em></p>
+      ${list}
+      ${phrases}
+    </div>
+  `;
+}
+
+form.addEventListener("submit", async (event) => {
+  event.preventDefault();
+  const payload = {
+    last_date: document.getElementById("last_date").value,
+    target_date: document.getElementById("observe_date").value,
+    cycle_length: document.getElementById("cycle_length").value,
+    menses_days: document.getElementById("menses_days").value,
+    role: document.getElementById("role").value,
+    tone: document.getElementById("tone").value,
+  };
+  resultEl.style.display = "block";
+  resultEl.innerHTML = "正在计算，请稍候...";
+  try {
+    const response = await fetch("/api/evaluate", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      resultEl.innerHTML = `<span style="color:#dc2626"><strong>错误：</strong>${data.error}</span>`;
+      return;
+    }
+
+    resultEl.innerHTML = `
+      <div><strong>观察日期：</strong>${data.observed_date}</div>
+      <div><strong>周期日：</strong>${data.cycle_day} / ${data.cycle_length} 天</div>
+      <div><strong>阶段：</strong>${data.phase}</div>
+      <div class="hormones">
+        <div class="h-item"><strong>雌激素</strong><span>${data.hormones.estrogen}%</span></div>
+        <div class="h-item"><strong>孕激素</strong><span>${data.hormones.progesterone}%</span></div>
+        <div class="h-item"><strong>LH</strong><span>${data.hormones.LH}%</span></div>
+        <div class="h-item"><strong>睾酮</strong><span>${data.hormones.testosterone}%</span></div>
+      </div>
+      <div>
+        <strong>常见感受：</strong>
+        <ul>${data.symptoms.map((item) => `<li>${item}</li>`).join("")}</ul>
+      </div>
+      ${renderAdvice(data.advice)}
+    `;
+  } catch (error) {
+    resultEl.innerHTML = `<span style="color:#dc2626"><strong>错误：</strong>网络或服务器异常，请稍后再试。</span>`;
+  }
+});
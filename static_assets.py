@@ -0,0 +1,94 @@
+"""In-memory, pre-compressed responses for the landing page and its assets."""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from threading import Lock
+from typing import Dict, Tuple
+
+from flask import Request, Response
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+ASSET_MAX_AGE = 365 * 86400
+PAGE_MAX_AGE = 86400
+
+
+class PrecompressedAsset:
+    """A response body held in memory with a gzip variant and strong ETags."""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str) -> None:
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def response(self, request: Request) -> Response:
+        use_gzip = request.accept_encodings["gzip"] > 0 and len(self.gzip_body) < len(self.body)
+        etag = f"{self.digest}-gz" if use_gzip else self.digest
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.gzip_body if use_gzip else self.body, content_type=self.content_type)
+            if use_gzip:
+                response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = self.cache_control
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+class AssetRegistry:
+    """Fingerprinted files from STATIC_DIR, loaded once per process."""
+
+    def __init__(self, directory: str = STATIC_DIR) -> None:
+        self.directory = directory
+        self._assets: Dict[str, PrecompressedAsset] = {}
+        self._lock = Lock()
+
+    def get(self, name: str) -> PrecompressedAsset:
+        asset = self._assets.get(name)
+        if asset is None:
+            with self._lock:
+                asset = self._assets.get(name)
+                if asset is None:
+                    asset = self._assets[name] = self._load(name)
+        return asset
+
+    def _load(self, name: str) -> PrecompressedAsset:
+        path = os.path.join(self.directory, name)
+        if os.path.dirname(os.path.normpath(name)) or not os.path.isfile(path):
+            raise FileNotFoundError(name)
+        with open(path, "rb") as handle:
+            body = handle.read()
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type.endswith("javascript"):
+            content_type += "; charset=utf-8"
+        return PrecompressedAsset(body, content_type, f"public, max-age={ASSET_MAX_AGE}, immutable")
+
+    def url(self, name: str) -> str:
+        """Fingerprinted URL, e.g. /assets/app.3f2a9c1b7d4e.js."""
+        stem, extension = os.path.splitext(name)
+        return f"/assets/{stem}.{self.get(name).digest[:12]}{extension}"
+
+    @staticmethod
+    def split_fingerprint(fingerprinted: str) -> Tuple[str, str]:
+        """Split "app.3f2a9c1b7d4e.js" into ("app.js", "3f2a9c1b7d4e")."""
+        stem, extension = os.path.splitext(fingerprinted)
+        name, _, fingerprint = stem.rpartition(".")
+        return f"{name}{extension}", fingerprint
+
+    def resolve(self, fingerprinted: str) -> PrecompressedAsset | None:
+        """Asset for a fingerprinted file name, None if the fingerprint is stale.
+
+        Raises FileNotFoundError for unknown assets.
+        """
+        name, fingerprint = self.split_fingerprint(fingerprinted)
+        asset = self.get(name)
+        return asset if len(fingerprint) == 12 and asset.digest.startswith(fingerprint) else None
+
+
+__all__ = ["ASSET_MAX_AGE", "AssetRegistry", "PAGE_MAX_AGE", "PrecompressedAsset", "STATIC_DIR"]
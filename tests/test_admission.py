@@ -0,0 +1,38 @@
+import pytest
+
+import app as app_module
+from admission import AdmissionController, RouteLimits
+from app import app
+
+
+@pytest.fixture
+def admitted(monkeypatch):
+    monkeypatch.setitem(app.config, "ADMISSION_ENABLED", True)
+    monkeypatch.setitem(app.config, "ADMISSION_CLIENT_HEADER", "X-Forwarded-For")
+    monkeypatch.setitem(app.config, "ADMISSION_TRUSTED_PROXIES", 1)
+    limits = {"/api/forecast": RouteLimits(client_rate=1, client_burst=1)}
+    monkeypatch.setattr(app_module, "admission", AdmissionController(limits))
+    return app.test_client()
+
+
+def _forecast(client, forwarded_for):
+    return client.post(
+        "/api/forecast",
+        json={"last_date": "2024-01-01", "days": 3},
+        headers={"X-Forwarded-For": forwarded_for},
+    )
+
+
+def test_client_key_ignores_spoofed_leftmost_hops(admitted):
+    assert _forecast(admitted, "1.1.1.1, 203.0.113.7").status_code == 200
+    # A new spoofed value does not buy a new bucket: the proxy-appended hop is the same.
+    response = _forecast(admitted, "2.2.2.2, 203.0.113.7")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert _forecast(admitted, "203.0.113.8").status_code == 200
+
+
+def test_trusted_proxy_count_selects_the_hop(admitted, monkeypatch):
+    monkeypatch.setitem(app.config, "ADMISSION_TRUSTED_PROXIES", 2)
+    assert _forecast(admitted, "9.9.9.9, 198.51.100.1, 10.0.0.1").status_code == 200
+    assert _forecast(admitted, "8.8.8.8, 198.51.100.1, 10.0.0.2").status_code == 429
@@ -0,0 +1,41 @@
+from app import app
+
+
+def test_batch_reports_malformed_items_and_evaluates_the_rest():
+    items = [
+        {"last_date": "2024-01-01", "target_date": "2024-01-10"},
+        {"last_date": 20240101},
+        {"last_date": "2024-01-01", "target_date": 5},
+        {"last_date": "2024-01-01", "target_date": "2024-01-10", "role": ["self"]},
+        "not an object",
+        {"last_date": "2024-01-01", "target_date": "2024-01-20", "tone": "playful"},
+    ]
+    response = app.test_client().post("/api/evaluate/batch", json={"items": items})
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result.get("error") for result in results] == [
+        None,
+        "请按照 YYYY-MM-DD 的格式填写日期。",
+        "请按照 YYYY-MM-DD 的格式填写日期。",
+        "角色与语气需要是文本。",
+        "每一项都需要是 JSON 对象。",
+        None,
+    ]
+    assert results[0]["cycle_day"] == 10
+    assert results[5]["cycle_day"] == 20
+
+
+def test_non_text_model_is_a_client_error():
+    client = app.test_client()
+    item = {"last_date": "2024-01-01", "target_date": "2024-01-10", "model": ["default"]}
+
+    response = client.post("/api/evaluate", json=item)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "激素模型名称需要是文本。"}
+
+    response = client.post("/api/evaluate/batch", json={"items": [item, dict(item, model="reference")]})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert results[0] == {"error": "激素模型名称需要是文本。"}
+    assert results[1]["cycle_day"] == 10
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+import bulk_evaluate
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bad_record_becomes_an_error_row_and_the_run_continues(tmp_path, workers):
+    records = [
+        {"id": "a", "last_date": "2024-01-01", "target_date": "2024-01-10"},
+        {"id": "b", "last_date": 20240101, "target_date": "2024-01-10"},
+        {"id": "c", "last_date": "2024-01-01", "target_date": "2024-01-12", "model": ["default"]},
+        {"id": "d", "last_date": "2024-01-01", "target_date": "2024-01-20"},
+        {"id": "e", "last_date": "2024-01-01", "cycle_length": float("inf")},
+    ]
+    source = tmp_path / "input.ndjson"
+    lines = [json.dumps(record) for record in records]
+    lines.insert(2, "[1, 2")
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    target = tmp_path / "output.ndjson"
+
+    status = bulk_evaluate.main(
+        [str(source), "-o", str(target), "--workers", str(workers), "--chunk-size", "2", "--progress-interval", "0"]
+    )
+
+    assert status == 0
+    rows = [json.loads(line) for line in target.read_text(encoding="utf-8").splitlines()]
+    assert [(row.get("id"), row.get("error"), row.get("cycle_day")) for row in rows] == [
+        ("a", None, 10),
+        ("b", "请按照 YYYY-MM-DD 的格式填写日期。", None),
+        (None, "无法解析的 JSON 行。", None),
+        ("c", "激素模型名称需要是文本。", None),
+        ("d", None, 20),
+        ("e", "周期长度与经期天数需要是数字。", None),
+    ]
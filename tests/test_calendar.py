@@ -0,0 +1,40 @@
+import pytest
+
+from app import app
+
+
+@pytest.mark.parametrize("phase", [["luteal"], {"luteal": 1}, 3, "spring"])
+def test_unknown_phase_is_a_client_error(phase):
+    response = app.test_client().post("/api/calendar/next", json={"last_date": "2024-01-01", "phase": phase})
+
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("未知的周期阶段")
+
+
+def test_next_windows_past_the_last_date_are_a_client_error():
+    payload = {"last_date": "9999-11-01", "from_date": "9999-12-20"}
+    response = app.test_client().post("/api/calendar/next", json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "日期范围超出了支持的范围（最晚到 9999-12-31）。"}
+
+
+def test_timeline_past_the_last_date_is_a_client_error():
+    client = app.test_client()
+    payload = {"last_date": "9999-12-01", "start_date": "9999-12-31"}
+
+    response = client.post("/api/calendar/timeline", json=payload)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "日期范围超出了支持的范围（最晚到 9999-12-31）。"}
+
+    response = client.post("/api/calendar/timeline", json=dict(payload, days=1))
+    assert response.status_code == 200
+    assert response.get_json()["end_date"] == "9999-12-31"
+
+
+def test_infinite_timeline_day_count_is_a_client_error():
+    payload = {"last_date": "2024-01-01", "days": float("inf")}
+    response = app.test_client().post("/api/calendar/timeline", json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "预测天数需要是数字。"}
@@ -0,0 +1,41 @@
+import os
+import signal
+
+import pytest
+
+from app import _catches, app
+from calculator import calculate_cycle_details
+from content_pack import get_pack
+
+
+def test_loaded_content_is_read_only_at_every_level():
+    pack = get_pack()
+    variant = pack.self_advice["luteal"][0]
+
+    with pytest.raises(TypeError):
+        variant["headline"] = "changed"
+    with pytest.raises(TypeError):
+        pack.partner_advice["luteal"][0]["tips"] = ()
+
+    advice = calculate_cycle_details("2024-01-01", observation_date="2024-01-10", role="self")["advice"]
+    with pytest.raises(TypeError):
+        advice["headline"] = "changed"
+
+
+def test_admin_reload_outside_gunicorn_reaches_this_process_only():
+    app.config["ADMIN_TOKEN"] = "secret"
+    try:
+        response = app.test_client().post("/admin/content/reload", headers={"Authorization": "Bearer secret"})
+    finally:
+        app.config["ADMIN_TOKEN"] = None
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["version"] == get_pack().content_version
+    assert body["scope"] == "this_process"
+    assert body["signalled"] == []
+
+
+def test_reload_signal_is_only_sent_to_processes_that_handle_it():
+    assert _catches(os.getpid(), signal.SIGHUP)
+    assert not _catches(os.getpid(), signal.SIGUSR2)
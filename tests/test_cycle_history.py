@@ -0,0 +1,64 @@
+import base64
+from datetime import date
+
+import pytest
+
+from app import app
+from cycle_history import _STATE_FORMAT, CycleHistory
+
+
+def _token(mean=28.0, variance=1.0, trend=0.0, menses_mean=5.0, ordinal=date(2024, 1, 1).toordinal()):
+    raw = _STATE_FORMAT.pack(1, 0.3, ordinal, 3, 0, mean, variance, trend, 28, 1, menses_mean)
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def test_round_trip():
+    history = CycleHistory()
+    history.extend([(date(2024, 1, 1), 5), (date(2024, 1, 29), 4), (date(2024, 2, 27), None)])
+    restored = CycleHistory.from_token(history.to_token())
+    assert restored.summary() == history.summary()
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"mean": float("inf")},
+        {"variance": float("nan")},
+        {"trend": float("-inf")},
+        {"menses_mean": float("inf")},
+        {"variance": -1.0},
+        {"ordinal": date.max.toordinal()},
+    ],
+)
+def test_crafted_state_is_rejected(fields):
+    with pytest.raises(ValueError, match="周期记录状态无效。"):
+        CycleHistory.from_token(_token(**fields))
+
+    response = app.test_client().post("/api/history", json={"state": _token(**fields)})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "周期记录状态无效。"}
+
+
+@pytest.mark.parametrize(
+    "payload, error",
+    [
+        ({"period_starts": ["9999-12-31"]}, "日期范围超出了支持的范围（最晚到 9999-12-31）。"),
+        ({"period_starts": [{"date": "2024-01-01", "menses_days": float("inf")}]}, "周期长度与经期天数需要是数字。"),
+        ({"period_starts": ["2024-01-01"], "role": ["self"]}, "角色与语气需要是文本。"),
+        ({"period_starts": ["2024-01-01"], "tone": {"a": 1}}, "角色与语气需要是文本。"),
+        ({"period_starts": ["2024-01-01"], "model": ["default"]}, "激素模型名称需要是文本。"),
+    ],
+)
+def test_malformed_history_request_is_a_client_error(payload, error):
+    response = app.test_client().post("/api/history", json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_last_start_leaves_room_for_the_next_one():
+    history = CycleHistory()
+    with pytest.raises(ValueError):
+        history.add(date.max)
+    history.add(date.fromordinal(date.max.toordinal() - 40))
+    assert history.summary()["next_period_date"] == "9999-12-19"
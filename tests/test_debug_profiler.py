@@ -0,0 +1,29 @@
+import pytest
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    app.config.update(DEBUG_PROFILER=True, ADMIN_TOKEN="secret")
+    try:
+        yield app.test_client()
+    finally:
+        app.config.update(DEBUG_PROFILER=False, ADMIN_TOKEN=None)
+
+
+@pytest.mark.parametrize("route", ["/debug/profile", "/debug/allocations"])
+def test_non_object_body_is_a_client_error(client, route):
+    response = client.post(route, json=[1], headers={"Authorization": "Bearer secret"})
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "请求内容需要是 JSON 对象。"}
+
+
+def test_infinite_stack_depth_is_a_client_error(client):
+    response = client.post(
+        "/debug/allocations", json={"frames": float("inf")}, headers={"Authorization": "Bearer secret"}
+    )
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "窗口时长与栈深度需要是数字。"}
@@ -0,0 +1,27 @@
+from datetime import date, datetime
+
+import app as app_module
+from app import app
+
+
+def test_evaluate_uses_one_day_for_the_cache_key_and_the_result(monkeypatch):
+    # A clock that crosses midnight between reads must not split the request across two days.
+    class NextDay(date):
+        @classmethod
+        def today(cls):
+            return date(2024, 1, 11)
+
+    class FixedDateTime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 1, 10, 23, 59, 59)
+
+    monkeypatch.setattr("calculator.date", NextDay)
+    monkeypatch.setattr(app_module, "datetime", FixedDateTime)
+    app_module.response_cache.clear()
+
+    response = app.test_client().post("/api/evaluate", json={"last_date": "2024-01-01"})
+
+    assert response.status_code == 200
+    assert response.get_json()["observed_date"] == "2024-01-10"
+    assert response.get_json()["cycle_day"] == 10
@@ -0,0 +1,59 @@
+import pytest
+
+from app import app
+
+ROUTES = (
+    "/api/evaluate",
+    "/api/forecast",
+    "/api/forecast/uncertainty",
+    "/api/calendar/next",
+    "/api/calendar/counts",
+    "/api/calendar/timeline",
+    "/api/history",
+)
+
+
+@pytest.mark.parametrize("route", ROUTES)
+@pytest.mark.parametrize("body", [["2024-01-01"], "2024-01-01", 5])
+def test_non_object_body_is_a_client_error(route, body):
+    response = app.test_client().post(route, json=body)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "请求内容需要是 JSON 对象。"}
+
+
+def test_forecast_past_the_last_date_is_a_client_error():
+    client = app.test_client()
+    payload = {"last_date": "9999-12-01", "start_date": "9999-12-20", "days": 20}
+
+    response = client.post("/api/forecast", json=payload)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "日期范围超出了支持的范围（最晚到 9999-12-31）。"}
+
+    response = client.post("/api/forecast", json=dict(payload, days=12))
+    assert response.status_code == 200
+    assert response.get_json()["end_date"] == "9999-12-31"
+
+
+def test_uncertainty_past_the_last_date_is_a_client_error():
+    client = app.test_client()
+    payload = {"last_date": "9999-12-01", "start_date": "9999-12-31", "samples": 10}
+
+    response = client.post("/api/forecast/uncertainty", json=payload)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "日期范围超出了支持的范围（最晚到 9999-12-31）。"}
+
+    response = client.post("/api/forecast/uncertainty", json=dict(payload, days=1))
+    assert response.status_code == 200
+    assert response.get_json()["end_date"] == "9999-12-31"
+
+    response = client.post("/api/forecast/uncertainty", json=dict(payload, samples=float("inf")))
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "预测天数与采样次数需要是数字。"}
+
+
+def test_infinite_day_count_is_a_client_error():
+    response = app.test_client().post("/api/forecast", json={"last_date": "2024-01-01", "days": float("inf")})
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "预测天数需要是数字。"}
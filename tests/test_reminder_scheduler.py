@@ -0,0 +1,32 @@
+import json
+
+import reminder_scheduler
+
+
+def test_run_skips_malformed_user_lines(tmp_path, capsys):
+    users = tmp_path / "users.ndjson"
+    users.write_text(
+        "\n".join(
+            [
+                json.dumps({"id": "a", "last_date": "2024-01-01"}),
+                json.dumps({"id": "b", "last_date": 20240101}),
+                json.dumps([1, 2]),
+                "{not json",
+                json.dumps({"id": "c", "last_date": "2024-01-05"}),
+            ]
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    state = tmp_path / "state.json"
+
+    status = reminder_scheduler.main(["run", str(users), "--state", str(state), "--today", "2024-01-20"])
+
+    assert status == 0
+    assert sorted(user[0] for user in json.loads(state.read_text(encoding="utf-8"))["users"]) == ["a", "c"]
+    errors = capsys.readouterr().err.splitlines()
+    assert errors == [
+        "skipped line 2 (b): 请按照 YYYY-MM-DD 的格式填写日期。",
+        "skipped line 3: not a JSON object",
+        "skipped line 4: invalid JSON",
+    ]
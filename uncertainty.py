@@ -0,0 +1,215 @@
+"""Monte Carlo phase probabilities and hormone percentile bands.
+
+Cycle and luteal lengths are sampled per cycle around the user's values,
+so predictions widen as they reach further past the last period. Each
+sample's day is mapped to (cycle_day, cycle_length, luteal_length) in one
+vectorized pass, phases follow the `_estimate_phase_key` boundaries and
+hormone levels come from a table compiled with `HormoneModel.evaluate`.
+
+Results depend only on the window's offset from the last period, not on
+its calendar date, so they are cached per (parameters, window).
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+from calculator import (
+    DEFAULT_CYCLE_LENGTH,
+    DEFAULT_MENSES_DAYS,
+    MAX_CYCLE_LENGTH,
+    MAX_FORECAST_DAYS,
+    MIN_CYCLE_LENGTH,
+    PHASE_KEYS,
+    _check_range_end,
+    _parse_date,
+    _resolve_observation,
+)
+from hormone_model import HORMONE_KEYS, HormoneModel, get_model, prebuilt_table
+
+DEFAULT_SAMPLES = 1000
+MAX_SAMPLES = 5000
+DEFAULT_CYCLE_LENGTH_STD = 2.0
+DEFAULT_LUTEAL_STD = 1.5
+MIN_LUTEAL_LENGTH = 8
+MAX_LUTEAL_LENGTH = 18
+MAX_HORIZON_DAYS = 3 * MAX_FORECAST_DAYS
+PERCENTILES = (10, 50, 90)
+
+
+CUBE_SHAPE = (MAX_LUTEAL_LENGTH + 1, MAX_CYCLE_LENGTH + 1, MAX_CYCLE_LENGTH + 1, len(HORMONE_KEYS))
+
+
+def build_hormone_cube(model: HormoneModel) -> np.ndarray:
+    """Levels indexed by [luteal_length, cycle_length, cycle_day]."""
+    luteal = np.arange(MAX_LUTEAL_LENGTH + 1)[:, None, None]
+    lengths = np.arange(MAX_CYCLE_LENGTH + 1)[None, :, None]
+    days = np.arange(MAX_CYCLE_LENGTH + 1)[None, None, :]
+    return model.evaluate(days, lengths, luteal).astype(np.int16)
+
+
+@lru_cache(maxsize=8)
+def _hormone_cube(model: HormoneModel) -> np.ndarray:
+    cube = prebuilt_table("luteal_cube", model, CUBE_SHAPE)
+    if cube is None:
+        cube = build_hormone_cube(model)
+        cube.setflags(write=False)
+    return cube
+
+
+def _sample_days(
+    offset: int,
+    days: int,
+    cycle_length: int,
+    cycle_length_std: float,
+    luteal_length: float,
+    luteal_std: float,
+    samples: int,
+    seed: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(cycle_day, cycle_length, luteal_length) arrays of shape (samples, days)."""
+    rng = np.random.default_rng(seed)
+    cycles = (offset + days) // MIN_CYCLE_LENGTH + 2
+    lengths = np.clip(
+        np.rint(rng.normal(cycle_length, cycle_length_std, (samples, cycles))), MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH
+    ).astype(np.int32)
+    luteal = np.clip(
+        np.rint(rng.normal(luteal_length, luteal_std, (samples, cycles))), MIN_LUTEAL_LENGTH, MAX_LUTEAL_LENGTH
+    ).astype(np.int32)
+
+    starts = np.zeros_like(lengths)
+    np.cumsum(lengths[:, :-1], axis=1, out=starts[:, 1:])
+    # Cycle index per (sample, day): count the cycle starts already passed.
+    # A short loop over cycles keeps every pass a cheap small-int comparison.
+    day_offsets = offset + np.arange(days, dtype=np.int32)
+    index = np.zeros((samples, days), dtype=np.int32)
+    for cycle in range(1, cycles):
+        index += day_offsets[None, :] >= starts[:, cycle : cycle + 1]
+    flat = index + (np.arange(samples, dtype=np.int32) * cycles)[:, None]
+
+    cycle_days = day_offsets[None, :] - starts.ravel()[flat] + 1
+    return cycle_days, lengths.ravel()[flat], luteal.ravel()[flat]
+
+
+@lru_cache(maxsize=128)
+def _bands(
+    offset: int,
+    days: int,
+    cycle_length: int,
+    menses_days: int,
+    cycle_length_std: float,
+    luteal_std: float,
+    samples: int,
+    model: HormoneModel,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Phase probabilities (4, days) and hormone percentiles (len(PERCENTILES), days, 4)."""
+    luteal_length = model.luteal_length
+    # Numeric tuples hash the same in every process, so workers agree on the draw.
+    seed = hash((offset, days, cycle_length, menses_days, cycle_length_std, luteal_std, samples)) & 0xFFFFFFFF
+    cycle_days, lengths, luteal = _sample_days(
+        offset, days, cycle_length, cycle_length_std, luteal_length, luteal_std, samples, seed
+    )
+
+    ovulation_day = np.maximum(1, lengths - luteal)
+    ov_start = np.maximum(1, ovulation_day - 1)
+    ov_end = np.minimum(lengths, ovulation_day + 1)
+    codes = np.full(cycle_days.shape, PHASE_KEYS.index("follicular"), dtype=np.int8)
+    codes[cycle_days > ov_end] = PHASE_KEYS.index("luteal")
+    codes[(cycle_days >= ov_start) & (cycle_days <= ov_end)] = PHASE_KEYS.index("ovulation")
+    codes[cycle_days <= menses_days] = PHASE_KEYS.index("menstruation")
+    probabilities = np.stack([(codes == code).mean(axis=0) for code in range(len(PHASE_KEYS))])
+
+    # Levels are integers 0-100, so nearest-rank percentiles come from one
+    # cumulative histogram per (day, hormone) instead of sorting the samples.
+    levels = _hormone_cube(model)[luteal, lengths, cycle_days]
+    cells = (np.arange(days)[:, None] * len(HORMONE_KEYS) + np.arange(len(HORMONE_KEYS))[None, :]) * 101
+    counts = np.bincount((levels + cells[None, :, :]).ravel(), minlength=days * len(HORMONE_KEYS) * 101)
+    cumulative = counts.reshape(days, len(HORMONE_KEYS), 101).cumsum(axis=2)
+    ranks = [int(round(percentile / 100 * (samples - 1))) for percentile in PERCENTILES]
+    percentiles = np.stack([(cumulative <= rank).sum(axis=2) for rank in ranks])
+
+    probabilities.setflags(write=False)
+    percentiles.setflags(write=False)
+    return probabilities, percentiles
+
+
+def prediction_bands(
+    last_period_date: str,
+    *,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    days: int | None = None,
+    cycle_length: int = DEFAULT_CYCLE_LENGTH,
+    menses_days: int = DEFAULT_MENSES_DAYS,
+    cycle_length_std: float = DEFAULT_CYCLE_LENGTH_STD,
+    luteal_std: float = DEFAULT_LUTEAL_STD,
+    samples: int = DEFAULT_SAMPLES,
+    model: str | None = None,
+) -> Dict[str, object]:
+    """Per-day phase probabilities and hormone p10/p50/p90 over a date range.
+
+    The range follows `forecast_cycle_range`: it starts at `start_date`
+    (default: `last_period_date`) and ends at `end_date` or spans `days`
+    days (default: one cycle).
+    """
+    start, _ = _resolve_observation(
+        last_period_date, start_date or last_period_date, cycle_length, menses_days
+    )
+    if end_date:
+        span = (_parse_date(end_date) - start).days + 1
+        if span < 1:
+            raise ValueError("结束日期不能早于开始日期。")
+    else:
+        span = cycle_length if days is None else days
+        if span < 1:
+            raise ValueError("预测天数至少为 1 天。")
+    if span > MAX_FORECAST_DAYS:
+        raise ValueError(f"单次预测最多 {MAX_FORECAST_DAYS} 天。")
+    _check_range_end(start, span)
+    offset = (start - _parse_date(last_period_date)).days
+    if offset + span > MAX_HORIZON_DAYS:
+        raise ValueError(f"预测范围最多到上次月经开始后 {MAX_HORIZON_DAYS} 天。")
+    if not 0 <= cycle_length_std <= 10 or not 0 <= luteal_std <= 5:
+        raise ValueError("周期波动范围需要在 0-10 天之间，黄体期波动需要在 0-5 天之间。")
+    if not 1 <= samples <= MAX_SAMPLES:
+        raise ValueError(f"采样次数需要在 1-{MAX_SAMPLES} 之间。")
+
+    probabilities, percentiles = _bands(
+        offset,
+        span,
+        cycle_length,
+        menses_days,
+        float(cycle_length_std),
+        float(luteal_std),
+        samples,
+        get_model(model),
+    )
+    return {
+        "cycle_length": cycle_length,
+        "menses_days": menses_days,
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=span - 1)).isoformat(),
+        "samples": samples,
+        "phase_probabilities": {
+            phase_key: np.round(probabilities[code], 3).tolist() for code, phase_key in enumerate(PHASE_KEYS)
+        },
+        "hormones": {
+            key: {f"p{percentile}": percentiles[row, :, column].tolist() for row, percentile in enumerate(PERCENTILES)}
+            for column, key in enumerate(HORMONE_KEYS)
+        },
+    }
+
+
+__all__ = [
+    "CUBE_SHAPE",
+    "DEFAULT_CYCLE_LENGTH_STD",
+    "DEFAULT_LUTEAL_STD",
+    "DEFAULT_SAMPLES",
+    "MAX_SAMPLES",
+    "PERCENTILES",
+    "build_hormone_cube",
+    "prediction_bands",
+]